@@ -8,6 +8,9 @@ import requests
 import os
 import glob
 import re
+import ast
+import functools
+import threading
 import concurrent.futures
 from config import get_db as _get_central_db
 import datetime as _dt
@@ -40,6 +43,10 @@ except LookupError:
 SENSORS_COL = "sensors"
 ARTICLES_COL = "articles"
 
+# Shared pool for the short concurrent fetches below (Home snapshot, IoT feeds),
+# so no request pays for creating and joining a fresh thread pool
+_IO_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=6, thread_name_prefix="dm-io")
+
 def get_db():
     return _get_central_db()
 
@@ -91,6 +98,11 @@ def get_latest_reading(plant_id: str) -> Optional[Dict[str, Any]]:
     rows = get_sensor_history(plant_id, limit=1)
     return rows[0] if rows else None
 
+def get_sensor_bundle(plant_id: str, limit: int = 10) -> Dict[str, Any]:
+    """Latest reading + recent history from one query (history is newest first)."""
+    hist = get_sensor_history(plant_id, limit=limit)
+    return {"latest": hist[0] if hist else None, "history": hist}
+
 def get_all_readings(limit: Optional[int] = None) -> List[Dict[str, Any]]:
     db = get_db()
     q = db.collection(SENSORS_COL).order_by("timestamp", direction=firestore.Query.DESCENDING)
@@ -98,6 +110,28 @@ def get_all_readings(limit: Optional[int] = None) -> List[Dict[str, Any]]:
         q = q.limit(int(limit))
     return [_doc_to_dict(doc) for doc in q.stream()]
 
+def get_home_snapshot(username: Optional[str] = None, recent: int = 50) -> Dict[str, Any]:
+    """
+    Everything the Home overview needs, fetched concurrently in one call:
+    the user's plant count and the `recent` newest readings (newest first,
+    so readings[0] is the latest). A part that fails comes back as None.
+    """
+    from plants_manager import count_plants
+
+    def _safe(fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            print(f"Error fetching home snapshot ({fn.__name__}): {e}")
+            return None
+
+    plants_f = _IO_EXECUTOR.submit(_safe, count_plants, username) if username else None
+    readings_f = _IO_EXECUTOR.submit(_safe, get_all_readings, recent)
+    return {
+        "plants": plants_f.result() if plants_f else 0,
+        "readings": readings_f.result(),
+    }
+
 # ==========================================
 # EXTERNAL IOT SERVER INTEGRATION
 # ==========================================
@@ -125,15 +159,14 @@ def sync_iot_data(plant_id: str) -> bool:
         return feed, None
 
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            # Start all requests
-            futures = [executor.submit(_fetch, f) for f in feeds]
-            
-            # Collect results
-            for future in concurrent.futures.as_completed(futures):
-                f, val = future.result()
-                if val is not None:
-                    sensor_data[f] = val
+        # Start all requests
+        futures = [_IO_EXECUTOR.submit(_fetch, f) for f in feeds]
+
+        # Collect results
+        for future in concurrent.futures.as_completed(futures):
+            f, val = future.result()
+            if val is not None:
+                sensor_data[f] = val
 
         if sensor_data:
             final_temp = sensor_data.get("temperature")
@@ -155,6 +188,30 @@ def sync_iot_data(plant_id: str) -> bool:
         print(f"[IOT] Connection failed: {e}")
         return False
 
+
+IOT_SYNC_MIN_INTERVAL_SECONDS = 30
+_last_iot_sync: dict[str, float] = {}  # {plant_id: monotonic time of last sync attempt}
+_iot_sync_lock = threading.Lock()
+
+
+def claim_iot_sync(plant_id: str, force: bool = False) -> bool:
+    """
+    Reserves a sync for this plant unless it was synced in the last 30s.
+    Recorded per attempt (not per success) so a down IoT server doesn't add
+    its timeout to every dropdown change. Returns True if the caller should sync.
+    """
+    now = time.monotonic()
+    with _iot_sync_lock:
+        if not force and now - _last_iot_sync.get(plant_id, float("-inf")) < IOT_SYNC_MIN_INTERVAL_SECONDS:
+            return False
+        _last_iot_sync[plant_id] = now
+    return True
+
+
+def maybe_sync_iot_data(plant_id: str, force: bool = False) -> bool:
+    """sync_iot_data behind the per-plant 30s throttle. Returns True if a new reading was stored."""
+    return claim_iot_sync(plant_id, force) and bool(sync_iot_data(plant_id))
+
 # ==========================================
 # ARTICLES (TXT/DOCX) + CRUD
 # ==========================================
@@ -407,33 +464,50 @@ def build_index(max_docs: int = 5, use_stem: bool = True, include_title: bool =
 import numpy as np
 
 # Dependency checks (like lecturer)
-try:
-    import chromadb
-    CHROMADB_AVAILABLE = True
-except ImportError:
-    CHROMADB_AVAILABLE = False
+# Only the *availability* is checked at import time: chromadb, sentence-transformers
+# (torch) and sklearn take seconds to import and are only needed once the Search page
+# builds its PlantRAG, so PlantRAG imports them itself.
+from importlib.util import find_spec as _find_spec
 
-try:
-    from sentence_transformers import SentenceTransformer
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
 
-try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.metrics.pairwise import cosine_similarity
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
+def _has_module(name: str) -> bool:
+    try:
+        return _find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+
+CHROMADB_AVAILABLE = _has_module("chromadb")
+TRANSFORMERS_AVAILABLE = _has_module("sentence_transformers")
+SKLEARN_AVAILABLE = _has_module("sklearn")
+GEMINI_AVAILABLE = _has_module("google.generativeai")
+if not GEMINI_AVAILABLE:
     print("Warning: google-generativeai not installed. Run: pip install google-generativeai")
 
 
+# Whitespace collapse used on every ingested article and query
+_WS_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_metadata_str(raw: str) -> dict:
+    # Vector stores only hold scalar metadata, so article metadata is stored
+    # as str(dict); each distinct string is parsed once, not on every render
+    try:
+        meta = ast.literal_eval(raw)
+    except Exception:
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def _article_metadata(raw) -> dict:
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, str) and raw:
+        return dict(_parse_metadata_str(raw))
+    return {}
+
+
 class SimpleVectorStore:
     """Fallback vector store when ChromaDB is not available."""
     def __init__(self):
@@ -492,6 +566,7 @@ class PlantRAG:
 
         if TRANSFORMERS_AVAILABLE:
             try:
+                from sentence_transformers import SentenceTransformer
                 self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
                 self.use_transformers = True
             except Exception:
@@ -500,6 +575,7 @@ class PlantRAG:
         if (not self.use_transformers):
             if not SKLEARN_AVAILABLE:
                 raise RuntimeError("No SentenceTransformers and no sklearn TF-IDF available. Install sentence-transformers or scikit-learn.")
+            from sklearn.feature_extraction.text import TfidfVectorizer
             self.tfidf = TfidfVectorizer(max_features=2000, stop_words="english")
             self.use_tfidf = True
 
@@ -507,6 +583,7 @@ class PlantRAG:
         self.use_chromadb = False
         if CHROMADB_AVAILABLE:
             try:
+                import chromadb
                 client = chromadb.Client()
                 try:
                     self.collection = client.get_collection("plant_articles")
@@ -536,6 +613,7 @@ class PlantRAG:
 
         if api_key and GEMINI_AVAILABLE:
             try:
+                import google.generativeai as genai
                 genai.configure(api_key=api_key)
                 self.use_gemini = True
             except Exception as e:
@@ -548,8 +626,7 @@ class PlantRAG:
     def preprocess_text(self, text: str) -> str:
         if not text:
             return ""
-        text = re.sub(r"\s+", " ", text)
-        return text.strip()
+        return _WS_RE.sub(" ", text).strip()
 
 
     def generate_embeddings(self, texts: list[str]):
@@ -579,10 +656,17 @@ class PlantRAG:
 
             documents.append(text)
             raw_metadata = a.get("metadata") or {}
+            # Resolve the link once here (DOI link when there is no url),
+            # so rendering results never has to work it out
+            url = str(a.get("url") or "").strip()
+            if not url and isinstance(raw_metadata, dict):
+                doi = str(raw_metadata.get("doi") or "").strip()
+                if doi:
+                    url = f"https://doi.org/{doi}"
             metadatas.append({
                 "title": str(title),
                 "article_id": str(a.get("id", "")),
-                "url": str(a.get("url", "")),
+                "url": url,
                 "metadata": str(raw_metadata),
             })
 
@@ -671,7 +755,62 @@ class PlantRAG:
         if not self.use_gemini:
             return self._template_response_smart(question, docs)
 
-    
+        prompt = self._answer_prompt(question, docs, metas)
+
+        for model_name in self.models_to_try:
+            try:
+                # print(f"Trying model: {model_name}...") # Debug line
+                import google.generativeai as genai
+                model = genai.GenerativeModel(model_name)
+                response = model.generate_content(prompt)
+                
+                if response and response.text:
+                    return response.text 
+                    
+            except Exception as e:
+                print(f"Model {model_name} failed: {e}")
+                continue
+
+        print("All Gemini models failed. Switching to Technical Fallback.")
+        return self._template_response_smart(question, docs)
+
+    def generate_response_stream(self, question: str, docs: list[str], metas: list[dict], sims: list[float]):
+        """
+        Streaming variant of generate_response: yields (answer_so_far, used_gemini)
+        as Gemini produces it (same model cascade and fallback). used_gemini is
+        True only on the last item of a complete Gemini answer; partial answers
+        and the snippet fallback report False.
+        """
+        if not self.use_gemini:
+            yield self._template_response_smart(question, docs), False
+            return
+
+        prompt = self._answer_prompt(question, docs, metas)
+
+        for model_name in self.models_to_try:
+            text = ""
+            try:
+                import google.generativeai as genai
+                model = genai.GenerativeModel(model_name)
+                for chunk in model.generate_content(prompt, stream=True):
+                    piece = getattr(chunk, "text", "") or ""
+                    if piece:
+                        text += piece
+                        yield text, False
+                if text:
+                    yield text, True
+                    return
+            except Exception as e:
+                print(f"Model {model_name} failed: {e}")
+                if text:
+                    # Keep the partial answer already shown
+                    return
+                continue
+
+        print("All Gemini models failed. Switching to Technical Fallback.")
+        yield self._template_response_smart(question, docs), False
+
+    def _answer_prompt(self, question: str, docs: list[str], metas: list[dict]) -> str:
         context_text = ""
         for m, d in zip(metas, docs):
             title = m.get('title', 'Unknown Source')
@@ -691,25 +830,14 @@ class PlantRAG:
         Context Articles:
         {context_text}
         """
+        return prompt
 
-        for model_name in self.models_to_try:
-            try:
-                # print(f"Trying model: {model_name}...") # Debug line
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                
-                if response and response.text:
-                    return response.text 
-                    
-            except Exception as e:
-                print(f"Model {model_name} failed: {e}")
-                continue
 
-        print("All Gemini models failed. Switching to Technical Fallback.")
-        return self._template_response_smart(question, docs)
-
-
-    def query(self, question: str, top_k: int = 5, fallback_threshold: float = 0.20, progress_callback=None) -> dict:
+    def _retrieve(self, question: str, top_k: int, fallback_threshold: float, progress_callback=None):
+        """
+        Search half of query(): returns (result, docs, metas, sims) where
+        result is the response-less answer dict (final if docs is empty).
+        """
         # Progress: Initializing
         if progress_callback:
             progress_callback(0.1, desc="Initializing RAG & Loading Knowledge Base...")
@@ -735,7 +863,7 @@ class PlantRAG:
                 "best_sim": 0.0,
                 "sources": [],
                 "chunks": []
-            }
+            }, docs, metas, []
 
         # Convert distances to similarities (1 - distance)
         sims = []
@@ -758,27 +886,57 @@ class PlantRAG:
                 "url": m.get("url"),
                 "snippet": (doc[:320].replace("\n", " ") + "...") if doc else "",
                 "article_id": m.get("article_id"),
-                "metadata": (m.get("metadata") or {}),
+                "metadata": _article_metadata(m.get("metadata")),
             })
 
+        return {
+            "response": "",
+            "papers_found": len(docs),
+            "used_fallback": used_fallback,
+            "best_sim": float(best_sim),
+            "sources": metas,
+            "chunks": chunks
+        }, docs, metas, sims
+
+
+    def query(self, question: str, top_k: int = 5, fallback_threshold: float = 0.20, progress_callback=None) -> dict:
+        result, docs, metas, sims = self._retrieve(question, top_k, fallback_threshold, progress_callback)
+        if not docs:
+            return result
+
         # Progress: Consulting AI
         if progress_callback:
             progress_callback(0.6, desc="Consulting Gemini AI...")
         
-        response_text = self.generate_response(question, docs, metas, sims)
+        result["response"] = self.generate_response(question, docs, metas, sims)
 
         # Progress: Formatting
         if progress_callback:
             progress_callback(0.9, desc="Formatting Answer...")
 
-        return {
-            "response": response_text,
-            "papers_found": len(docs),
-            "used_fallback": used_fallback,
-            "best_sim": float(best_sim),
-            "sources": metas,
-            "chunks": chunks
-        }
+        return result
+
+
+    def query_stream(self, question: str, top_k: int = 5, fallback_threshold: float = 0.20, progress_callback=None):
+        """
+        Same as query(), but a generator: yields the result dict repeatedly
+        with "response" growing as the answer streams in. "used_gemini" is True
+        once the response is a complete Gemini answer (not a fallback).
+        """
+        result, docs, metas, sims = self._retrieve(question, top_k, fallback_threshold, progress_callback)
+        result["used_gemini"] = False
+        if not docs:
+            yield result
+            return
+
+        # Progress: Consulting AI
+        if progress_callback:
+            progress_callback(0.6, desc="Consulting Gemini AI...")
+
+        for text, used_gemini in self.generate_response_stream(question, docs, metas, sims):
+            result["response"] = text
+            result["used_gemini"] = used_gemini
+            yield result
 
 
 
@@ -817,6 +975,11 @@ def seed_database_with_articles(folder_path: str = "articles_data", do_build_ind
         build_index(max_docs=5, use_stem=True)
 
 
+# Vacation report status -> icon, and the rendered "STATUS icon" labels
+VACATION_STATUS_ICONS = {"CRITICAL": "💀", "NEEDS WATER": "💧", "SAFE": "✅", "ERROR": "❌"}
+_VACATION_STATUS_LABELS = {k: f"{k} {v}" for k, v in VACATION_STATUS_ICONS.items()}
+
+
 def generate_vacation_report(username, days_away, progress_callback=None):
     """
     Generates a survival report utilizing AI for context-aware predictions 
@@ -831,7 +994,7 @@ def generate_vacation_report(username, days_away, progress_callback=None):
         list: A list of report rows [Plant Name, Current Soil, Status, Message].
     """ 
     import plants_manager
-    from plants_manager import list_plants, get_vacation_advice_ai
+    from plants_manager import list_plants, get_vacation_advice_ai_batch
 
     if progress_callback:
         progress_callback(0.1, desc="Loading your plants...")
@@ -841,8 +1004,15 @@ def generate_vacation_report(username, days_away, progress_callback=None):
     
     # Global safety limit for vacations (in days)
     GLOBAL_MAX_DAYS = 21 
+
+    try:
+        days = int(days_away)
+    except (ValueError, TypeError):
+        days = 0
     
+    # 1. Fetch real-time sensor data for every plant
     total_plants = len(user_plants)
+    plant_inputs = []
     for idx, plant in enumerate(user_plants):
         plant_id = plant.get("plant_id")
         plant_name = plant.get("name", "Unknown Plant")
@@ -853,7 +1023,6 @@ def generate_vacation_report(username, days_away, progress_callback=None):
             progress = 0.2 + (0.3 * idx / max(total_plants, 1))
             progress_callback(progress, desc=f"Fetching sensor data for {plant_name}...")
         
-        # 1. Fetch real-time sensor data
         latest_data = get_latest_reading(plant_id)
         
         # Default values if no sensor data is found
@@ -861,29 +1030,29 @@ def generate_vacation_report(username, days_away, progress_callback=None):
         # Default to 25°C if no temp sensor available
         current_temp = float(latest_data.get("temp", 25)) if latest_data else 25 
 
-        try:
-            days = int(days_away)
-        except (ValueError, TypeError):
-            days = 0
+        plant_inputs.append({
+            "plant_name": plant_name,
+            "current_soil": current_soil,
+            "min_threshold": plant_threshold,
+            "current_temp": current_temp,
+        })
+
+    # === AI ENHANCEMENT START ===
+    # Progress: Consulting AI
+    if progress_callback:
+        progress_callback(0.5, desc=f"Consulting AI for {total_plants} plants...")
+
+    # One batched request for all plants instead of one request per plant
+    ai_results = get_vacation_advice_ai_batch(plant_inputs, days) or [None] * total_plants
+
+    for p, ai_result in zip(plant_inputs, ai_results):
+        plant_name = p["plant_name"]
+        plant_threshold = p["min_threshold"]
+        current_soil = p["current_soil"]
 
         status = ""
         msg = ""
         
-        # === AI ENHANCEMENT START ===
-        # Progress: Consulting AI
-        if progress_callback:
-            progress = 0.5 + (0.3 * idx / max(total_plants, 1))
-            progress_callback(progress, desc=f"Consulting AI for {plant_name}...")
-        
-        # Attempt to get smart advice based on temperature and plant species
-        ai_result = get_vacation_advice_ai(
-            plant_name=plant_name,
-            current_soil=current_soil,
-            min_threshold=plant_threshold,
-            current_temp=current_temp,
-            days_away=days
-        )
-        
         if ai_result:
             # If AI analysis is successful, use its recommendation
             status = ai_result.get("status", "UNKNOWN")
@@ -892,9 +1061,9 @@ def generate_vacation_report(username, days_away, progress_callback=None):
             msg = f"{ai_result.get('message')} -> {ai_result.get('recommendation')}"
             
             # Add visual indicators based on status
-            if status == "CRITICAL": status += " 💀"
-            elif status == "NEEDS WATER": status += " 💧"
-            elif status == "SAFE": status += " ✅"
+            icon = VACATION_STATUS_ICONS.get(status)
+            if icon:
+                status = f"{status} {icon}"
 
         else:
             # === FALLBACK LOGIC ===
@@ -911,15 +1080,15 @@ def generate_vacation_report(username, days_away, progress_callback=None):
             predicted_soil = current_soil - (days * drying_rate)
             
             if days > GLOBAL_MAX_DAYS:
-                status = "CRITICAL 💀"
+                status = _VACATION_STATUS_LABELS["CRITICAL"]
                 msg = "Vacation too long. System limit exceeded."
             elif predicted_soil < plant_threshold:
-                status = "NEEDS WATER 💧"
+                status = _VACATION_STATUS_LABELS["NEEDS WATER"]
                 # Calculate how many days until critical level
                 days_left = max(0, int((current_soil - plant_threshold) / drying_rate))
                 msg = f"Will dry in {days_left} days. Water or add irrigation."
             else:
-                status = "SAFE ✅"
+                status = _VACATION_STATUS_LABELS["SAFE"]
                 msg = f"Predicted soil: {int(predicted_soil)}%. Have fun!"
         
         # === END PROCESS ===
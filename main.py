@@ -17,17 +17,13 @@ def _get_all_plant_ids():
     plant_ids = []
     
     try:
-        # Get all users
-        users = db.collection("users").stream()
-        for user_doc in users:
-            username = user_doc.id
-            # Get all plants for this user
-            plants = db.collection("users").document(username).collection("plants").stream()
-            for plant_doc in plants:
-                plant_data = plant_doc.to_dict()
-                pid = plant_data.get("plant_id")
-                if pid:
-                    plant_ids.append(pid)
+        # Single collection-group query over users/*/plants (instead of one query per user)
+        plants = db.collection_group("plants").select(["plant_id"]).stream()
+        for plant_doc in plants:
+            plant_data = plant_doc.to_dict()
+            pid = plant_data.get("plant_id")
+            if pid:
+                plant_ids.append(pid)
     except Exception as e:
         print(f"[AutoFetch] Error fetching plant IDs: {e}")
     
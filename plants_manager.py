@@ -10,6 +10,7 @@ Each plant document can store:
 - name (display name)
 - species (optional)
 - image_url (recommended when using cloud storage)
+- thumb_url (optional small gallery thumbnail; set by add_plant_with_image)
 - image_path (optional local fallback)
 """
 
@@ -20,11 +21,16 @@ import uuid
 from typing import Any
 import os
 import re
+import json
 import time
 import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import TTLCache
 
-# --- New Imports for AI ---
-import google.generativeai as genai
+# google.generativeai and firebase_admin.storage are heavy and only needed by
+# the AI / upload paths, so they are imported lazily inside those functions.
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -33,21 +39,70 @@ load_dotenv()
 from config import get_db
 
 
+@functools.lru_cache(maxsize=1)
+def _db():
+    """Firestore client shared by every function in this module."""
+    return get_db()
+
+
 # ==========================================
 # CACHING LAYER (TTL-based)
 # ==========================================
 
-_plants_cache: dict[str, tuple[list, float]] = {}  # {username: (plants_list, timestamp)}
 _CACHE_TTL_SECONDS = 60  # Cache expires after 60 seconds
+_CACHE_MAX_USERS = 1024  # Least-recently-used users are evicted beyond this
+
+_plants_cache: TTLCache = TTLCache(maxsize=_CACHE_MAX_USERS, ttl=_CACHE_TTL_SECONDS)  # {username: plants_list}
+_cache_lock = threading.RLock()  # Gradio handlers run on a threadpool
+
+
+_SOIL_CACHE_TTL_SECONDS = 24 * 3600  # AI soil thresholds rarely change
+_soil_cache: TTLCache = TTLCache(maxsize=512, ttl=_SOIL_CACHE_TTL_SECONDS)  # {species_lower: min_soil}
+_soil_cache_lock = threading.Lock()
+
+# Well-known species answered without any cache or AI lookup
+_SOIL_DEFAULTS = {
+    "basil": 40,
+    "cactus": 10,
+    "succulent": 10,
+    "aloe": 10,
+    "aloe vera": 10,
+    "snake plant": 10,
+    "tomato": 50,
+    "orchid": 50,
+    "fern": 55,
+    "mint": 50,
+    "parsley": 40,
+    "rosemary": 25,
+    "lavender": 20,
+    "monstera": 30,
+    "pothos": 25,
+}
+
+# Shared (cross-process) soil cache in Firestore: ai_cache/{species_lower}
+_AI_CACHE_COL = "ai_cache"
+_AI_CACHE_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+
+
+# Callbacks run after clear_plants_cache(username) so caches derived from a
+# user's plants (e.g. the Home overview metrics) are dropped with it
+_plants_cache_listeners: list = []
+
+
+def on_plants_cache_cleared(callback) -> None:
+    """Registers callback(username_or_None) to run whenever the plants cache is cleared."""
+    _plants_cache_listeners.append(callback)
 
 
 def clear_plants_cache(username: str = None):
     """Clears plant list cache. If username given, only that user's cache."""
-    global _plants_cache
-    if username:
-        _plants_cache.pop(username, None)
-    else:
-        _plants_cache.clear()
+    with _cache_lock:
+        if username:
+            _plants_cache.pop(username, None)
+        else:
+            _plants_cache.clear()
+    for callback in _plants_cache_listeners:
+        callback(username)
 
 
 def _utc_now_iso() -> str:
@@ -59,29 +114,157 @@ def _clean(s: Any) -> str:
     """Convert input to a trimmed string safely."""
     return str(s).strip() if s is not None else ""
 
-def get_optimal_soil(species_name: str) -> int:
-    """Uses Gemini AI to get optimal soil moisture for a plant. Returns 30 on failure."""
+# ==========================================
+# AI HELPERS (Gemini)
+# ==========================================
+
+# List of models to try in order (Fallback mechanism)
+GEMINI_MODELS = [
+    'gemini-2.0-flash',       # First priority
+    'gemini-2.5-flash',       # Second priority
+    'gemini-flash-latest',    # Fallback generic name
+    'models/gemini-2.0-flash' # Explicit path just in case
+]
+
+
+_INT_RE = re.compile(r'\d+')
+
+# Shared pool so AI lookups can overlap with other network work (e.g. uploads)
+_AI_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ai")
+
+
+_preferred_model = None  # Last model that answered successfully in this process
+
+
+def _models_in_order() -> list[str]:
+    """GEMINI_MODELS with the last known-good model tried first."""
+    preferred = _preferred_model
+    if preferred is None:
+        return GEMINI_MODELS
+    return [preferred] + [m for m in GEMINI_MODELS if m != preferred]
+
+
+def _remember_model(model_name: str) -> None:
+    """Marks a model as known-good so later calls skip models that fail here."""
+    global _preferred_model
+    _preferred_model = model_name
+
+
+_genai_api_key = None  # API key genai is currently configured with
+_model_cache: dict = {}  # {model_name: GenerativeModel}
+_model_lock = threading.Lock()
+
+
+def _get_model(model_name: str):
+    """Returns a cached GenerativeModel, running genai.configure once per API key."""
+    global _genai_api_key
+    import google.generativeai as genai
+
     api_key = os.getenv("GOOGLE_API_KEY")
-    
-    # Safety check: If no API key is found, return default immediately
-    if not api_key:
-        print("[AI Warning] No GOOGLE_API_KEY found in .env. Using default 30%.")
-        return 30
+    with _model_lock:
+        if api_key != _genai_api_key:
+            genai.configure(api_key=api_key)
+            _genai_api_key = api_key
+            _model_cache.clear()
+        model = _model_cache.get(model_name)
+        if model is None:
+            model = _model_cache[model_name] = genai.GenerativeModel(model_name)
+    return model
 
-   # List of models to try in order (Fallback mechanism)
-    models_to_try = [
-        'gemini-2.0-flash',       # First priority
-        'gemini-2.5-flash',       # Second priority
-        'gemini-flash-latest',    # Fallback generic name
-        'models/gemini-2.0-flash' # Explicit path just in case
-    ]
-    
-    genai.configure(api_key=api_key)
 
-    # Clean the input
-    species_name = species_name.strip()
+_JSON_DECODER = json.JSONDecoder()
 
-    prompt = f"""
+# Optional faster JSON parser
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+def _parse_json_response(text: str, opener: str = "{"):
+    """
+    Parses the first JSON value starting with `opener` ('{' or '[') in an AI
+    response, ignoring surrounding text such as Markdown code fences.
+    """
+    start = text.find(opener)
+    if start < 0:
+        raise ValueError(f"No JSON {opener!r} found in AI response")
+
+    # Fast path: the JSON value spans up to the last matching closer
+    end = text.rfind("}" if opener == "{" else "]")
+    if end > start:
+        try:
+            return _json_loads(text[start:end + 1])
+        except ValueError:
+            pass
+
+    # Trailing text contains the closer too: scan for the exact end of the value
+    return _JSON_DECODER.raw_decode(text, start)[0]
+
+
+def _ai_cache_doc(cache_key: str):
+    """Firestore document holding the shared AI soil value for a species."""
+    # '/' is a path separator in Firestore document ids
+    return _db().collection(_AI_CACHE_COL).document(cache_key.replace("/", "_"))
+
+
+def _read_ai_soil_cache(cache_key: str) -> int | None:
+    """Returns the shared cached soil value if present and fresh, else None."""
+    try:
+        snap = _ai_cache_doc(cache_key).get()
+        if not snap.exists:
+            return None
+        data = snap.to_dict() or {}
+        ts = datetime.fromisoformat(data.get("ts", ""))
+        if (datetime.now(timezone.utc) - ts).total_seconds() >= _AI_CACHE_TTL_SECONDS:
+            return None
+        return int(data["value"])
+    except Exception as e:
+        print(f"[AI Cache] Read failed for '{cache_key}': {e}")
+        return None
+
+
+def _write_ai_soil_cache(cache_key: str, value: int) -> None:
+    """Stores a fresh AI soil value in the shared cache (best-effort)."""
+    try:
+        _ai_cache_doc(cache_key).set({"value": value, "ts": _utc_now_iso()})
+    except Exception as e:
+        print(f"[AI Cache] Write failed for '{cache_key}': {e}")
+
+
+def _cached_soil(cache_key: str) -> int | None:
+    """Looks a species up in the static table, then the L1 and L2 caches."""
+    # L0: static table of well-known species
+    val = _SOIL_DEFAULTS.get(cache_key)
+    if val is not None:
+        return val
+
+    # L1: in-process cache
+    with _soil_cache_lock:
+        val = _soil_cache.get(cache_key)
+    if val is not None:
+        return val
+
+    # L2: shared Firestore cache (benefits every user and survives restarts)
+    val = _read_ai_soil_cache(cache_key)
+    if val is not None:
+        with _soil_cache_lock:
+            _soil_cache[cache_key] = val
+    return val
+
+
+def _store_soil(cache_key: str, val: int) -> None:
+    """Caches a successful AI answer in both L1 and L2."""
+    # Only successful answers are cached, so a transient
+    # API failure doesn't pin the fallback for a whole day.
+    with _soil_cache_lock:
+        _soil_cache[cache_key] = val
+    _write_ai_soil_cache(cache_key, val)
+
+
+def _soil_prompt(species_name: str) -> str:
+    return f"""
     You are an expert agronomist. 
     I am growing a plant of type: "{species_name}".
     What is the critical minimum soil moisture percentage (0-100%) this plant needs to survive before it starts wilting?
@@ -89,20 +272,51 @@ def get_optimal_soil(species_name: str) -> int:
     Return ONLY the number (integer). No text.
     Example response: 30
     """
-    # This loop was causing the indentation error - now fixed:
-    for model_name in models_to_try:
+
+
+def _parse_soil_value(text: str) -> int | None:
+    """Extracts a plausible soil percentage (5-90) from an AI answer."""
+    text = text.strip()
+    # Fast path: the model usually answers with just the number
+    if text.isdigit():
+        val = int(text)
+    else:
+        m = _INT_RE.search(text)
+        if not m:
+            return None
+        val = int(m.group())
+    return val if 5 <= val <= 90 else None
+
+
+def get_optimal_soil(species_name: str) -> int:
+    """Uses Gemini AI to get optimal soil moisture for a plant. Returns 30 on failure."""
+    # Clean the input
+    species_name = species_name.strip()
+    cache_key = species_name.lower()
+
+    cached = _cached_soil(cache_key)
+    if cached is not None:
+        return cached
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    
+    # Safety check: If no API key is found, return default immediately
+    if not api_key:
+        print("[AI Warning] No GOOGLE_API_KEY found in .env. Using default 30%.")
+        return 30
+
+    prompt = _soil_prompt(species_name)
+    for model_name in _models_in_order():
         try:
             print(f"[AI Agent] Connecting to model: {model_name} for '{species_name}'...")
-            model = genai.GenerativeModel(model_name)
+            model = _get_model(model_name)
             
             response = model.generate_content(prompt)
-            text = response.text.strip()
-            
-            numbers = re.findall(r'\d+', text)
-            if numbers:
-                val = int(numbers[0])
-                if 5 <= val <= 90:
-                    return val
+            val = _parse_soil_value(response.text)
+            if val is not None:
+                _store_soil(cache_key, val)
+                _remember_model(model_name)
+                return val
             
         except Exception as e:
             print(f"[AI Log] Model {model_name} failed: {e}")
@@ -143,70 +357,83 @@ def add_plant(
         print(f"[Success] AI set soil threshold for '{name}' to {optimal_min}% (Term: '{ai_search_term}')")
     # --- AI Integration End ---
 
+    return _add_plant_core(username, name, species, optimal_min, image_url, image_path)
+
+
+def _add_plant_core(
+    username: str,
+    name: str,
+    species: str,
+    min_soil: int,
+    image_url: str = "",
+    image_path: str = "",
+    thumb_url: str = "",
+) -> tuple[bool, str]:
+    """
+    Writes a new plant document. Inputs must already be cleaned and validated
+    (by add_plant / add_plant_with_image); no AI call is made here.
+    """
     plant_id = uuid.uuid4().hex[:8]
     doc = {
         "plant_id": plant_id,
         "name": name,
         "species": species,
-        "min_soil": optimal_min, # <--- Storing the AI result in DB
+        "min_soil": min_soil, # <--- Storing the AI result in DB
         "image_url": image_url,
+        "thumb_url": thumb_url,
         "image_path": image_path,
         "created_at": _utc_now_iso(),
     }
 
-    db = get_db()
+    db = _db()
     try:
         db.collection("users").document(username).collection("plants").document(plant_id).set(doc)
+        _add_cached_plant(username, doc)
         return True, plant_id
     except Exception as e:
         return False, f"Failed to add plant: {e}"
 
 
-import json
-import os
-import google.generativeai as genai
+def get_vacation_advice_ai_batch(plants: list[dict], days_away) -> list[dict | None] | None:
+    """
+    Vacation advice for all of a user's plants from one Gemini request.
 
-import json
-import os
-import re
-import google.generativeai as genai
+    Args:
+        plants: [{plant_name, current_soil, min_threshold, current_temp}, ...]
+        days_away: Number of days the user will be away.
+
+    Returns:
+        A list aligned with `plants` (None for entries the AI skipped),
+        or None if the AI is unavailable (fallback to math logic).
+    """
+    if not plants:
+        return []
 
-def get_vacation_advice_ai(plant_name, current_soil, min_threshold, current_temp, days_away):
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         print("[System] Missing API Key.")
         return None
 
-    genai.configure(api_key=api_key)
-
-    # List of models to try in order (Fallback mechanism), same as in get_optimal_soil
-    models_to_try = [
-        'gemini-2.0-flash',       # First priority
-        'gemini-2.5-flash',       # Second priority
-        'gemini-flash-latest',    # Fallback generic name
-        'models/gemini-2.0-flash' # Explicit path just in case
-    ]
+    plant_lines = "\n".join(
+        f"    {i}. Type: {p['plant_name']} | Current Soil Moisture: {p['current_soil']}% | "
+        f"Minimum Survival Threshold: {p['min_threshold']}% | Indoor Temperature: {p['current_temp']}°C"
+        for i, p in enumerate(plants)
+    )
 
-    # Construct the prompt
     prompt = f"""
     You are an expert botanist.
     I am going on vacation for {days_away} days.
     
-    Plant Details:
-    - Type: {plant_name}
-    - Current Soil Moisture: {current_soil}%
-    - Minimum Survival Threshold: {min_threshold}%
-    
-    Environment Conditions (Real-time Sensor):
-    - Indoor Temperature: {current_temp}°C
+    Plants (with real-time sensor data):
+{plant_lines}
     
-    Task:
+    Task, for EACH plant:
     1. Analyze if the temperature indicates fast evaporation (Summer/Hot) or slow (Winter/Cold).
     2. Estimate the daily soil moisture loss % for this specific plant at this temperature.
     3. Determine if the plant will survive without intervention.
     4. Recommend action: "Water heavily now" OR "Must install automatic irrigation system".
     
-    Return ONLY a valid JSON object in this format:
+    Return ONLY a valid JSON array with exactly {len(plants)} objects, in the same order as the plants, each in this format:
     {{
         "status": "SAFE" or "NEEDS WATER" or "CRITICAL",
         "message": "Short explanation mentioning temp effect (e.g., 'High heat (30C) increases drying rate')",
@@ -214,55 +441,141 @@ def get_vacation_advice_ai(plant_name, current_soil, min_threshold, current_temp
     }}
     """
 
-    # Retry Loop: Try each model until one succeeds
-    for model_name in models_to_try:
+    for model_name in _models_in_order():
         try:
-            print(f"[AI Agent] Connecting to model: {model_name} for vacation advice...")
-            model = genai.GenerativeModel(model_name)
-            
+            print(f"[AI Agent] Connecting to model: {model_name} for vacation advice ({len(plants)} plants)...")
+            model = _get_model(model_name)
+
             response = model.generate_content(prompt)
-            text = response.text.strip()
-            
-            # Clean up Markdown formatting if present (```json ... ```)
-            if text.startswith("```json"):
-                text = text[7:-3].strip()
-            elif text.startswith("```"):
-                text = text[3:-3].strip()
-            
-            # Try to parse JSON
-            result = json.loads(text)
-            
-            # If successful, return the result immediately
-            return result
+            data = _parse_json_response(response.text, "[")
+
+            _remember_model(model_name)
+            return [
+                data[i] if i < len(data) and isinstance(data[i], dict) else None
+                for i in range(len(plants))
+            ]
 
         except Exception as e:
             print(f"[AI Log] Model {model_name} failed: {e}")
-            # Continue to the next model in the list
             continue
 
     print("[AI Error] All models failed. Returning None (fallback to math logic).")
     return None
 
+
+# Fields the UI actually reads; list_plants fetches only these (projection query)
+PLANT_FIELDS = ["plant_id", "name", "species", "image_url", "thumb_url", "image_path", "created_at", "min_soil"]
+
+
 def list_plants(username: str) -> list[dict]:
     """
     List all plants for the given user.
 
     Returns:
-        List of dicts: [{plant_id, name, species, image_url, image_path, created_at}, ...]
+        List of dicts: [{plant_id, name, species, image_url, thumb_url, image_path, created_at, min_soil}, ...]
     """
     username = _clean(username)
     if not username:
         return []
 
-    db = get_db()
-    ref = db.collection("users").document(username).collection("plants")
+    with _cache_lock:
+        cached = _plants_cache.get(username)
+    if cached is not None:
+        return list(cached)
+
+    db = _db()
+    ref = db.collection("users").document(username).collection("plants").select(PLANT_FIELDS)
 
     try:
         snap = ref.order_by("created_at").stream()
     except Exception:
         snap = ref.stream()
 
-    return [d.to_dict() for d in snap]
+    plants = [d.to_dict() for d in snap]
+    with _cache_lock:
+        _plants_cache[username] = plants
+    return list(plants)
+
+
+# Gallery columns derived from the cached plant list, dropped with it
+_gallery_cache: TTLCache = TTLCache(maxsize=_CACHE_MAX_USERS, ttl=_CACHE_TTL_SECONDS)
+
+
+def _drop_gallery_columns(username: str = None) -> None:
+    with _cache_lock:
+        if username:
+            _gallery_cache.pop(username, None)
+        else:
+            _gallery_cache.clear()
+
+
+on_plants_cache_cleared(_drop_gallery_columns)
+
+
+def plant_gallery_columns(username: str) -> dict:
+    """
+    The user's plants as parallel lists for the gallery, built in one pass
+    over list_plants() and cached until the plant list changes.
+
+    Returns:
+        {"count": n_plants,
+         "thumbs": [...], "images": [...], "names": [...],  # plants with an image
+         "choices": [(name, plant_id), ...]}                # plants with an id
+    Treat the lists as read-only (they are shared between calls).
+    """
+    username = _clean(username)
+    with _cache_lock:
+        cached = _gallery_cache.get(username)
+    if cached is not None:
+        return cached
+
+    plants = list_plants(username)
+    thumbs, images, names, choices = [], [], [], []
+    for p in plants:
+        get = p.get
+        pid = get("plant_id") or get("id") or ""
+        name = (get("name") or get("species") or "").strip() or "Plant"
+        img = get("image_url") or get("image_path")
+        if img:
+            thumbs.append(get("thumb_url") or img)
+            images.append(img)
+            names.append(name)
+        if pid:
+            choices.append((name, pid))
+
+    cols = {"count": len(plants), "thumbs": thumbs, "images": images, "names": names, "choices": choices}
+    with _cache_lock:
+        _gallery_cache[username] = cols
+    return cols
+
+
+def _add_cached_plant(username: str, doc: dict) -> None:
+    """
+    Write-through for adds: appends the new plant to the user's cached list
+    (if any; it is the newest, so order by created_at holds) instead of
+    dropping the list, so the next Plants/Sensors load doesn't re-query
+    Firestore. Listeners are still notified.
+    """
+    with _cache_lock:
+        cached = _plants_cache.get(username)
+        if cached is not None:
+            _plants_cache[username] = cached + [doc]
+    for callback in _plants_cache_listeners:
+        callback(username)
+
+
+def _drop_cached_plant(username: str, plant_id: str) -> None:
+    """
+    Write-through for deletes: removes the plant from the user's cached list
+    (if any) instead of dropping the whole list, so the reload that follows a
+    delete doesn't re-query Firestore. Listeners are still notified.
+    """
+    with _cache_lock:
+        cached = _plants_cache.get(username)
+        if cached is not None:
+            _plants_cache[username] = [p for p in cached if p.get("plant_id") != plant_id]
+    for callback in _plants_cache_listeners:
+        callback(username)
 
 
 def delete_plant(username: str, plant_id: str) -> tuple[bool, str]:
@@ -284,9 +597,10 @@ def delete_plant(username: str, plant_id: str) -> tuple[bool, str]:
     if not plant_id:
         return False, "Missing plant_id."
 
-    db = get_db()
+    db = _db()
     try:
         db.collection("users").document(username).collection("plants").document(plant_id).delete()
+        _drop_cached_plant(username, plant_id)
         return True, "Deleted."
     except Exception as e:
         return False, f"Failed to delete plant: {e}"
@@ -295,24 +609,71 @@ def delete_plant(username: str, plant_id: str) -> tuple[bool, str]:
 def count_plants(username: str) -> int:
     """
     Count how many plants a user has.
-    Uses aggregation count() if available, otherwise streams and counts.
+    Uses the cached plant list when fresh, otherwise aggregation count()
+    if available, otherwise loads (and caches) the plant list.
     """
     username = _clean(username)
     if not username:
         return 0
 
-    db = get_db()
+    with _cache_lock:
+        cached = _plants_cache.get(username)
+    if cached is not None:
+        return len(cached)
+
+    db = _db()
     ref = db.collection("users").document(username).collection("plants")
 
     try:
         agg = ref.count().get()
         return int(agg[0].value)
     except Exception:
-        return sum(1 for _ in ref.stream())
+        # Populates the cache, so the next count/list is free
+        return len(list_plants(username))
 
 
 import io
-from firebase_admin import storage
+
+
+def _encode_image(pil_image, quality: int = 85) -> tuple[io.BytesIO, str, str]:
+    """
+    Encodes a photo as WebP (JPEG if this Pillow build lacks WebP).
+
+    Returns:
+        (buffer, file_extension, content_type)
+    """
+    buf = io.BytesIO()
+    try:
+        pil_image.save(buf, format="WEBP", quality=quality, method=4)
+        return buf, "webp", "image/webp"
+    except Exception:
+        # JPEG has no alpha channel
+        buf = io.BytesIO()
+        pil_image.convert("RGB").save(buf, format="JPEG", quality=quality)
+        return buf, "jpg", "image/jpeg"
+
+
+THUMB_SIZE = (256, 256)
+
+
+def _upload_thumbnail(bucket, pil_image, blob_stem: str) -> str:
+    """
+    Uploads a small gallery thumbnail next to the full image.
+    Best-effort: returns "" on failure (the gallery falls back to image_url).
+    """
+    try:
+        thumb = pil_image.copy()
+        thumb.thumbnail(THUMB_SIZE)
+        buf, ext, content_type = _encode_image(thumb, quality=70)
+        size = buf.getbuffer().nbytes
+        buf.seek(0)
+        blob = bucket.blob(f"{blob_stem}_thumb.{ext}")
+        blob.upload_from_file(buf, content_type=content_type, size=size)
+        blob.make_public()
+        return blob.public_url
+    except Exception as e:
+        print(f"[Storage] Thumbnail upload failed: {e}")
+        return ""
 
 def add_plant_with_image(
     username: str,
@@ -325,7 +686,7 @@ def add_plant_with_image(
     Create a new plant AND upload the image to Firebase Storage.
     No local files are saved.
     
-    Path: user_uploads/{username}/{timestamp}_{uuid}.png
+    Path: user_uploads/{username}/{timestamp}_{uuid}.webp (or .jpg)
     """
     username = _clean(username)
     name = _clean(name)
@@ -338,37 +699,47 @@ def add_plant_with_image(
     if pil_image is None:
         return False, "Missing image."
 
+    # Start the AI soil lookup now so it runs while the image uploads
+    ai_search_term = species if species else name
+    ai_future = _AI_EXECUTOR.submit(get_optimal_soil, ai_search_term)
+
     try:
         # Progress: Processing image
         if progress_callback:
             progress_callback(0.1, desc="Processing & resizing image...")
         
-        # 1. Convert PIL image to bytes
-        img_byte_arr = io.BytesIO()
-        pil_image.save(img_byte_arr, format='PNG')
-        img_bytes = img_byte_arr.getvalue()
+        # 1. Encode PIL image into a single in-memory buffer
+        # (lossy WebP/JPEG: photos are far smaller and faster to encode than PNG)
+        img_buf, img_ext, content_type = _encode_image(pil_image)
+        img_size = img_buf.getbuffer().nbytes
+        img_buf.seek(0)
         
         # 2. Prepare Cloud Storage Path
         ts_str = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
         unique_id = uuid.uuid4().hex[:8]
-        blob_path = f"user_uploads/{username}/{ts_str}_{unique_id}.png"
+        blob_stem = f"user_uploads/{username}/{ts_str}_{unique_id}"
+        blob_path = f"{blob_stem}.{img_ext}"
         
         # Progress: Uploading
         if progress_callback:
             progress_callback(0.3, desc="Uploading to Cloud Storage...")
         
         # 3. Upload to Firebase Storage
+        from firebase_admin import storage
         bucket = storage.bucket()
         blob = bucket.blob(blob_path)
         
         print(f"[Storage] Uploading to {blob_path}...")
-        blob.upload_from_string(img_bytes, content_type="image/png")
+        blob.upload_from_file(img_buf, content_type=content_type, size=img_size)
         
         # 4. Make Public and Get URL
         blob.make_public()
         public_url = blob.public_url
         print(f"[Storage] Success! URL: {public_url}")
 
+        # 5. Small thumbnail for the gallery's first paint
+        thumb_url = _upload_thumbnail(bucket, pil_image, blob_stem)
+
     except Exception as e:
         print(f"[Error] Storage upload failed: {e}")
         return False, f"Failed to upload image: {e}"
@@ -377,20 +748,29 @@ def add_plant_with_image(
     if progress_callback:
         progress_callback(0.5, desc="Analyzing plant species via AI...")
 
-    # 5. Save metadata to Firestore (using existing add_plant which calls AI)
-    ok, result = add_plant(
+    # 6. Collect the AI result (usually done by now) and save metadata to Firestore
+    try:
+        optimal_min = ai_future.result()
+    except Exception as e:
+        print(f"[AI Error] Soil lookup failed: {e}. Using fallback 30%.")
+        optimal_min = 30
+    print(f"[Success] AI set soil threshold for '{name}' to {optimal_min}% (Term: '{ai_search_term}')")
+
+    ok, result = _add_plant_core(
         username=username,
         name=name,
         species=species,
+        min_soil=optimal_min,
         image_path="",
         image_url=public_url,
+        thumb_url=thumb_url,
     )
     
     # Progress: Saving
     if progress_callback:
         progress_callback(0.8, desc="Saving metadata to database...")
     
-    # 6. Fire-and-forget IoT sync (non-blocking)
+    # 7. Fire-and-forget IoT sync (non-blocking)
     if ok:
         if progress_callback:
             progress_callback(0.9, desc="Success! Triggering background sensor sync...")
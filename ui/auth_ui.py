@@ -3,7 +3,9 @@
 import gradio as gr
 from auth_service import register_user, login_user
 
-def auth_screen(user_state: gr.State):
+def auth_screen(user_state: gr.State, on_login=None):
+    # on_login: optional callback(username) fired as soon as a login succeeds,
+    # before the chained post-login events run (used to prefetch Home data)
  
     gr.Markdown("##  Login / Register")
 
@@ -61,29 +63,35 @@ def auth_screen(user_state: gr.State):
 
         # --- 3. Success Flow ---
         # res is user_data dict (from Firestore)
-        username = res.get("username", u)
+        # Stored already stripped, so handlers reading user_state needn't re-strip it
+        username = (res.get("username") or u).strip()
+        if on_login:
+            on_login(username)
         
         # Success: return username and clear password field
         return username, f"✅ Logged in as (`{username}`)", f"✅ Welcome back!", "", ""
 
     def do_register(u, d, pw, em):
+        # Only the message is sent here; form updates happen in after_register
         ok, msg = register_user(u, d, pw, em)
         if ok:
-            # Success: clear all registration fields
-            
-            return (
-                f"✅ {msg}<br>Now please login.",
-                "", "", "", "",                 # clear register fields
-                gr.update(value="Login"),       # switch mode to Login
-                gr.update(visible=True),        # show login col
-                gr.update(visible=False),       # hide register col
-                (u or ""),                      # prefill login username
-                ""                              # clear login password
-            )
+            return f"✅ {msg}<br>Now please login.", True
+        return f"❌ {msg}", False
+
+    def after_register(ok, u):
+        if not ok:
+            # Failure (the common path): leave every field untouched
+            # (an empty gr.update() is a no-op on Gradio 4 and 5 alike)
+            return tuple(gr.update() for _ in range(9))
+
+        # Success: clear all registration fields
         return (
-            f"❌ {msg}",
-            gr.update(), gr.update(), gr.update(), gr.update(),
-            gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+            "", "", "", "",                 # clear register fields
+            gr.update(value="Login"),       # switch mode to Login
+            gr.update(visible=True),        # show login col
+            gr.update(visible=False),       # hide register col
+            (u or ""),                      # prefill login username
+            ""                              # clear login password
         )
 
     # Login event is returned to home_ui.py
@@ -93,11 +101,15 @@ def auth_screen(user_state: gr.State):
         outputs=[user_state, current_user, login_msg, login_username, login_password],
     )
     # Register event updates tab selection + prefill login username
+    reg_ok = gr.State(False)
     reg_btn.click(
         fn=do_register,
         inputs=[reg_username, reg_display, reg_password, reg_email],
+        outputs=[reg_msg, reg_ok],
+    ).then(
+        fn=after_register,
+        inputs=[reg_ok, reg_username],
         outputs=[
-            reg_msg,
             reg_username, reg_display, reg_password, reg_email,
             mode,
             login_col, reg_col,
@@ -1,11 +1,20 @@
 
-import html
+import pickle
+import string
+import functools
+import threading
 import datetime as dt
 import gradio as gr
-import matplotlib.pyplot as plt
+import numpy as np
+from cachetools import TTLCache
+# matplotlib (~300 ms to import) is only needed once a dashboard is drawn, so it
+# is imported lazily inside the plot helpers instead of at app start.
+# pyplot is deliberately not used: figures it creates stay registered in its
+# global manager until plt.close(), so every dashboard refresh would leak one.
 
 from plants_manager import list_plants
-from data_manager import get_latest_reading, get_sensor_history, sync_iot_data
+from data_manager import get_sensor_history, maybe_sync_iot_data
+from ui.html_utils import escape_html
 
 
 # =========================
@@ -23,70 +32,119 @@ def _plant_label(p: dict) -> str:
     return f"{title} ({pid})" if pid else title
 
 
+_TS_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+
 def _parse_ts(x):
     if x is None:
         return None
     if isinstance(x, dt.datetime):
         return x
-    s = str(x).strip()
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+    s = str(x).strip()[:19]
+
+    # Fast path: ISO-looking strings go straight to the C parser
+    if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+        try:
+            return dt.datetime.fromisoformat(s)
+        except ValueError:
+            pass
+
+    for fmt in _TS_FORMATS:
         try:
-            return dt.datetime.strptime(s[:19], fmt)
+            return dt.datetime.strptime(s, fmt)
         except Exception:
             pass
     return None
 
 
+# One row per reading; NaN marks a missing sensor value
+# (float32 is plenty for plotting and halves the bytes moved)
+_HIST_DTYPE = np.dtype([
+    ("ts", "datetime64[s]"),
+    ("temp", "f4"),
+    ("humidity", "f4"),
+    ("soil", "f4"),
+])
+
+
+def _history_array(hist, since) -> np.ndarray:
+    """
+    Packs readings taken at/after `since` into a structured array.
+    Each column is converted by NumPy in one call: ISO timestamp strings
+    to datetime64 (unparseable/missing -> NaT), values to float (None -> NaN).
+    """
+    arr = np.empty(len(hist), dtype=_HIST_DTYPE)
+
+    ts_raw = [str(r.get("timestamp") or "")[:19] for r in hist]
+    try:
+        arr["ts"] = np.array(ts_raw, dtype="datetime64[s]")
+    except ValueError:
+        # Some non-ISO timestamp: fall back to the per-row parser
+        arr["ts"] = np.array([_parse_ts(r.get("timestamp")) for r in hist], dtype="datetime64[s]")
+
+    for col in ("temp", "humidity", "soil"):
+        arr[col] = np.array([r.get(col) for r in hist], dtype=float)
+
+    # NaT compares False, so rows without a timestamp drop out here too
+    return arr[arr["ts"] >= np.datetime64(since, "s")]
+
+
 # =========================
 # Health logic
 # =========================
 
-def _health_eval(latest: dict):
-    if not latest:
-        return 0, "No data", ["No sensor data found for this plant yet."]
+_HISTORY_LIMIT = 500
+_HISTORY_TTL_SECONDS = 15
 
-    temp = latest.get("temp")
-    hum = latest.get("humidity")
-    soil = latest.get("soil")
+# Short-lived per-plant history, so switching the range (7/14/30 days)
+# re-filters locally instead of re-querying Firestore
+_history_cache: TTLCache = TTLCache(maxsize=256, ttl=_HISTORY_TTL_SECONDS)  # {plant_id: rows}
+_history_lock = threading.Lock()
 
-    issues = []
-    score = 100
 
-    if soil is not None:
-        try:
-            soil_v = float(soil)
-            if soil_v < 30:
-                issues.append("Soil is dry → consider watering")
-                score -= 25
-            elif soil_v > 70:
-                issues.append("Soil is very wet → overwatering risk")
-                score -= 20
-        except Exception:
-            pass
+def _cached_history(pid: str, force: bool = False) -> list:
+    """get_sensor_history(pid, 500) behind a short TTL cache."""
+    with _history_lock:
+        if force:
+            _history_cache.pop(pid, None)
+        else:
+            hit = _history_cache.get(pid)
+            if hit is not None:
+                return hit
 
-    if temp is not None:
-        try:
-            t = float(temp)
-            if t < 15:
-                issues.append("Temperature is low")
-                score -= 15
-            elif t > 30:
-                issues.append("Temperature is high")
-                score -= 15
-        except Exception:
-            pass
+    hist = get_sensor_history(pid, limit=_HISTORY_LIMIT) or []
+    with _history_lock:
+        _history_cache[pid] = hist
+    return hist
 
-    if hum is not None:
-        try:
-            h = float(hum)
-            if h < 35:
-                issues.append("Humidity is low")
-                score -= 10
-            elif h > 75:
-                issues.append("Humidity is high")
-                score -= 10
-        except Exception:
-            pass
+
+def _bucket(value, low, high) -> int:
+    """-1 = missing/unparseable, 0 = below `low`, 1 = in range, 2 = above `high`."""
+    if value is None:
+        return -1
+    try:
+        v = float(value)
+    except Exception:
+        return -1
+    return 0 if v < low else 2 if v > high else 1
+
+
+# (message, penalty) for the below/above buckets of each field
+_SOIL_RULES = {0: ("Soil is dry → consider watering", 25), 2: ("Soil is very wet → overwatering risk", 20)}
+_TEMP_RULES = {0: ("Temperature is low", 15), 2: ("Temperature is high", 15)}
+_HUM_RULES = {0: ("Humidity is low", 10), 2: ("Humidity is high", 10)}
+
+
+@functools.lru_cache(maxsize=64)
+def _score_bucket(soil_b: int, temp_b: int, hum_b: int):
+    # Only 4 x 4 x 4 bucket combinations exist, so every reading is a cache hit after warm-up
+    issues = []
+    score = 100
+    for rules, b in ((_SOIL_RULES, soil_b), (_TEMP_RULES, temp_b), (_HUM_RULES, hum_b)):
+        if b in rules:
+            msg, penalty = rules[b]
+            issues.append(msg)
+            score -= penalty
 
     score = max(0, min(100, score))
 
@@ -100,12 +158,35 @@ def _health_eval(latest: dict):
     if not issues:
         issues = ["Looks good based on the latest reading."]
 
-    return score, status, issues
+    return score, status, tuple(issues)
+
+
+def _health_eval(latest: dict):
+    if not latest:
+        return 0, "No data", ["No sensor data found for this plant yet."]
+
+    score, status, issues = _score_bucket(
+        _bucket(latest.get("soil"), 30, 70),
+        _bucket(latest.get("temp"), 15, 30),
+        _bucket(latest.get("humidity"), 35, 75),
+    )
+    return score, status, list(issues)
+
 
+_SUMMARY_TPL = string.Template("$badge<br><b>Score:</b> $score<ul>$items</ul>")
+
+
+@functools.lru_cache(maxsize=8)
+def _status_badge(status: str) -> str:
+    # Only a handful of statuses exist ("Healthy", "Needs attention", ...)
+    return f"<b>Status:</b> {escape_html(status)}"
+
+
+@functools.lru_cache(maxsize=64)
+def _insight_item(text: str) -> str:
+    # Insights come from a small fixed set of messages, so the escaped form is cached
+    return f"<li>{escape_html(text)}</li>"
 
-def _health_score_only(reading: dict) -> int:
-    score, _, _ = _health_eval(reading)
-    return score
 
 # ======================================================
 # Matplotlib  styling
@@ -124,9 +205,19 @@ def _palette(is_dark: bool):
         "grid": "#cbd5e1",
     }
 
+def _new_fig(size=(7, 3.2)):
+    """Agg-backed Figure built without pyplot (no global figure manager)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=size)
+    FigureCanvasAgg(fig)
+    return fig
+
+
 def _styled_fig(is_dark: bool, size=(7, 3.2)):
     pal = _palette(is_dark)
-    fig = plt.figure(figsize=size)
+    fig = _new_fig(size)
     fig.patch.set_facecolor(pal["bg"])
     ax = fig.add_subplot(111)
 
@@ -160,72 +251,139 @@ def _styled_fig(is_dark: bool, size=(7, 3.2)):
 # =========================
 # Plot builders (Light-only / default matplotlib)
 # =========================
-def _line_plot(points, title, ylabel):
-    fig = plt.figure(figsize=(7, 3.2))
-    ax = fig.add_subplot(111)
+# All six panels live in one 3x2 figure: one PNG encode and one transfer per refresh.
+_PANEL_GRID = (
+    ("soil_hist", "temp"),
+    ("humidity", "soil"),
+    ("delta", "scatter"),
+)
+_TIME_PANELS = ("temp", "humidity", "soil")  # share one date x-axis
+
+
+def _rotate_dates(ax):
+    ax.tick_params(axis="x", labelrotation=30)
+    for lbl in ax.get_xticklabels():
+        lbl.set_ha("right")
+
+
+def _build_dashboard_fig():
+    fig = _new_fig(size=(14, 10))
+    grid = fig.subplots(3, 2)
+    axes = {name: grid[r, c] for r, row in enumerate(_PANEL_GRID) for c, name in enumerate(row)}
+
+    first = axes[_TIME_PANELS[0]]
+    for name in _TIME_PANELS[1:]:
+        axes[name].sharex(first)
+    for name in _TIME_PANELS:
+        _rotate_dates(axes[name])
+
+    # Constant margins instead of tight_layout/autofmt_xdate (no layout solver per refresh)
+    fig.subplots_adjust(bottom=0.08, left=0.06, right=0.98, top=0.96, hspace=0.55, wspace=0.18)
+    return fig, axes
+
+
+@functools.lru_cache(maxsize=1)
+def _dashboard_prototype() -> bytes:
+    # Blank, fully styled figure pickled once; unpickling it is ~2x faster than
+    # rebuilding the 3x2 grid, shared axes and tick setup for every refresh
+    return pickle.dumps(_build_dashboard_fig())
+
+
+def _clone_dashboard_fig():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig, axes = pickle.loads(_dashboard_prototype())
+    FigureCanvasAgg(fig)  # unpickled figures come back with a bare canvas
+    return fig, axes
+
+
+_PLOT_MAX_POINTS = 150  # per line series
+_SCATTER_MAX_POINTS = 300
+
+
+def _downsample(xs, ys, target=_PLOT_MAX_POINTS):
+    """Keeps every k-th point so at most ~`target` points are drawn."""
+    if len(xs) <= target:
+        return xs, ys
+    step = len(xs) // target + 1
+    return xs[::step], ys[::step]
+
+
+def _line_plot(ax, xs, ys, title, ylabel):
+    xs, ys = _downsample(xs, ys)
     ax.set_title(title, fontweight="bold")
     ax.set_xlabel("Time")
     ax.set_ylabel(ylabel)
-    if points:
-        xs, ys = zip(*points)
-        ax.plot(xs, ys, linewidth=2.4)
     ax.grid(True, alpha=0.25)
-    fig.autofmt_xdate()
-    fig.tight_layout()
-    return fig
+    if len(xs):
+        ax.plot(xs, ys, linewidth=2.4)
 
 
-def _hist_plot(values, title, xlabel):
-    fig = plt.figure(figsize=(7, 3.2))
-    ax = fig.add_subplot(111)
+def _hist_plot(ax, values, title, xlabel):
     ax.set_title(title, fontweight="bold")
     ax.set_xlabel(xlabel)
     ax.set_ylabel("Count")
-    if values:
+    if len(values):
         ax.hist(values, bins=10, alpha=0.9)
     ax.grid(True, alpha=0.25)
-    fig.tight_layout()
-    return fig
 
 
-def _scatter_plot(xs, ys, title, xlabel, ylabel):
-    fig = plt.figure(figsize=(7, 3.2))
-    ax = fig.add_subplot(111)
+def _scatter_plot(ax, xs, ys, title, xlabel, ylabel):
     ax.set_title(title, fontweight="bold")
     ax.set_xlabel(xlabel)
     ax.set_ylabel(ylabel)
-    if xs and ys:
+    if len(xs) > _SCATTER_MAX_POINTS:
+        # Random (seeded, so refreshes are stable) subset keeps the cloud's shape
+        idx = np.sort(np.random.default_rng(0).choice(len(xs), _SCATTER_MAX_POINTS, replace=False))
+        xs, ys = xs[idx], ys[idx]
+    if len(xs) and len(ys):
         ax.scatter(xs, ys, s=45, alpha=0.85)
     ax.grid(True, alpha=0.25)
-    fig.tight_layout()
-    return fig
 
 
-def _delta_plot(t, h, s):
-    fig = plt.figure(figsize=(7, 3.2))
-    ax = fig.add_subplot(111)
+def _delta_plot(ax, t, h, s):
+    """t, h, s: (xs, ys) array pairs for temperature, humidity and soil."""
+    import matplotlib.dates as mdates
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
 
     ax.set_title("Change between samples (Δ)", fontweight="bold")
     ax.set_xlabel("Time")
     ax.set_ylabel("Δ value")
 
-    def delta(points):
-        return [(points[i][0], points[i][1] - points[i - 1][1]) for i in range(1, len(points))]
-
-    if len(t) > 1:
-        xs, ys = zip(*delta(t))
-        ax.plot(xs, ys, label="Δ Temp")
-    if len(h) > 1:
-        xs, ys = zip(*delta(h))
-        ax.plot(xs, ys, label="Δ Humidity")
-    if len(s) > 1:
-        xs, ys = zip(*delta(s))
-        ax.plot(xs, ys, label="Δ Soil")
-
-    ax.legend(frameon=False)
+    # All series go into one LineCollection (a single draw call);
+    # the legend uses proxy artists since the collection has no per-series label
+    segments, colors, handles = [], [], []
+    for (xs, ys), label, color in ((t, "Δ Temp", "C0"), (h, "Δ Humidity", "C1"), (s, "Δ Soil", "C2")):
+        if len(xs) > 1:
+            dx, dy = _downsample(mdates.date2num(xs[1:]), np.diff(ys))
+            pts = np.column_stack([dx, dy])
+            segments.append(np.stack([pts[:-1], pts[1:]], axis=1))
+            colors.extend([color] * (len(pts) - 1))
+            handles.append(Line2D([], [], color=color, label=label))
+
+    if segments:
+        ax.add_collection(LineCollection(np.concatenate(segments), colors=colors, linewidths=1.5))
+        ax.xaxis_date()
+        ax.autoscale_view()
+        ax.legend(handles=handles, frameon=False)
     ax.grid(True, alpha=0.25)
-    fig.autofmt_xdate()
-    fig.tight_layout()
+    _rotate_dates(ax)
+
+
+def _dashboard_plot(pts_t, pts_h, pts_s, xs_s, ys_h):
+    """
+    Fills the six panels of a fresh dashboard figure and returns it.
+    Every call gets its own clone, so concurrent refreshes (dropdowns, Refresh,
+    a second tab) never draw into a figure another request is still rendering.
+    """
+    fig, axes = _clone_dashboard_fig()
+    _hist_plot(axes["soil_hist"], pts_s[1], "Soil moisture distribution", "Soil")
+    _line_plot(axes["temp"], *pts_t, "Temperature (°C)", "°C")
+    _line_plot(axes["humidity"], *pts_h, "Humidity (%)", "%")
+    _line_plot(axes["soil"], *pts_s, "Soil moisture trend", "Soil")
+    _delta_plot(axes["delta"], pts_t, pts_h, pts_s)
+    _scatter_plot(axes["scatter"], xs_s, ys_h, "Soil vs Humidity", "Soil", "Humidity")
     return fig
 
 # =========================
@@ -254,19 +412,9 @@ def dashboard_screen(user_state: gr.State):
     # -------- PLOTS (hidden by default) --------
     plots = gr.Column(visible=False)
     with plots:
-        with gr.Row():
-            p_soil_hist = gr.Plot()
-            p_temp = gr.Plot()
+        p_all = gr.Plot()
 
-        with gr.Row():
-            p_hum = gr.Plot()
-            p_soil = gr.Plot()
-
-        with gr.Row():
-            p_health = gr.Plot()
-            p_scatter = gr.Plot()
-
-    def load(u, pid, days):
+    def load(u, pid, days, force=False):
         username = _get_username(u)
 
         if not username:
@@ -275,7 +423,7 @@ def dashboard_screen(user_state: gr.State):
                 gr.update(choices=[], value=None),
                 "<b>Login required</b>",
                 gr.update(visible=False),
-                None, None, None, None, None, None
+                None,
             )
 
         plants = list_plants(username) or []
@@ -287,54 +435,48 @@ def dashboard_screen(user_state: gr.State):
                 gr.update(choices=[], value=None),
                 "<b>No plants yet</b>",
                 gr.update(visible=False),
-                None, None, None, None, None, None
+                None,
             )
 
         pid = pid or choices[0][1]
-        sync_iot_data(pid)
+        # A freshly synced reading makes the cached history stale
+        if maybe_sync_iot_data(pid, force=force):
+            force = True
 
         since = dt.datetime.utcnow() - dt.timedelta(days=int(days))
-        hist = get_sensor_history(pid, limit=500) or []
-
-        pts_t, pts_h, pts_s, pts_health = [], [], [], []
-        xs_s, ys_h = [], []
+        hist = _cached_history(pid, force=force)
 
-        for r in hist:
-            ts = _parse_ts(r.get("timestamp"))
-            if not ts or ts < since:
-                continue
+        arr = _history_array(hist, since)
+        ts = arr["ts"]
+        has_t = ~np.isnan(arr["temp"])
+        has_h = ~np.isnan(arr["humidity"])
+        has_s = ~np.isnan(arr["soil"])
 
-            if r.get("temp") is not None:
-                pts_t.append((ts, float(r["temp"])))
-            if r.get("humidity") is not None:
-                pts_h.append((ts, float(r["humidity"])))
-            if r.get("soil") is not None:
-                pts_s.append((ts, float(r["soil"])))
+        # Parallel (xs, ys) arrays per series, fed to the plotters as-is
+        pts_t = (ts[has_t], arr["temp"][has_t])
+        pts_h = (ts[has_h], arr["humidity"][has_h])
+        pts_s = (ts[has_s], arr["soil"][has_s])
 
-            pts_health.append((ts, _health_score_only(r)))
+        both = has_s & has_h
+        xs_s = arr["soil"][both]
+        ys_h = arr["humidity"][both]
 
-            if r.get("soil") is not None and r.get("humidity") is not None:
-                xs_s.append(float(r["soil"]))
-                ys_h.append(float(r["humidity"]))
-
-        latest = get_latest_reading(pid)
+        # History is newest-first, so its head is the latest reading
+        latest = hist[0] if hist else None
         score, status, insights = _health_eval(latest)
 
-        summary = f"<b>Status:</b> {status}<br><b>Score:</b> {score}<ul>"
-        summary += "".join(f"<li>{html.escape(i)}</li>" for i in insights)
-        summary += "</ul>"
+        summary = _SUMMARY_TPL.substitute(
+            badge=_status_badge(status),
+            score=score,
+            items="".join([_insight_item(str(i)) for i in insights]),
+        )
 
         return (
             "Dashboard loaded.",
             gr.update(choices=choices, value=pid),
             summary,
             gr.update(visible=True),
-            _hist_plot([v for _, v in pts_s], "Soil moisture distribution", "Soil"),
-            _line_plot(pts_t, "Temperature (°C)", "°C"),
-            _line_plot(pts_h, "Humidity (%)", "%"),
-            _line_plot(pts_s, "Soil moisture trend", "Soil"),
-            _delta_plot(pts_t, pts_h, pts_s),
-            _scatter_plot(xs_s, ys_h, "Soil vs Humidity", "Soil", "Humidity")
+            _dashboard_plot(pts_t, pts_h, pts_s, xs_s, ys_h),
         )
 
 
@@ -342,8 +484,7 @@ def dashboard_screen(user_state: gr.State):
         c.change(
             load,
             inputs=[user_state, plant_dd, days_dd],
-            outputs=[info, plant_dd, summary_html, plots,p_soil_hist, p_temp, p_hum, p_soil,
-            p_health, p_scatter],
+            outputs=[info, plant_dd, summary_html, plots, p_all],
         )
     # # Reactive: update when plant dropdown selection changes
     # plant_dd.change(
@@ -369,22 +510,14 @@ def dashboard_screen(user_state: gr.State):
     #     ],
     # )
 
-    # Manual refresh button
+    # Manual refresh button (bypasses the history cache)
     refresh_btn.click(
-        load,
+        lambda u, pid, days: load(u, pid, days, force=True),
         inputs=[user_state, plant_dd, days_dd],
-        outputs=[
-            info, plant_dd, summary_html,
-            plots,
-            p_soil_hist, p_temp, p_hum, p_soil,
-            p_health, p_scatter
-        ],
+        outputs=[info, plant_dd, summary_html, plots, p_all],
     )
 
     # Return components for external wiring (auto-load on navigation)
     return refresh_btn, load, [user_state, plant_dd, days_dd], [
-        info, plant_dd, summary_html,
-        plots,
-        p_soil_hist, p_temp, p_hum, p_soil,
-        p_health, p_scatter
+        info, plant_dd, summary_html, plots, p_all
     ]
@@ -1,50 +1,69 @@
 
+import sys
+import time
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import gradio as gr
 from datetime import datetime, timezone
+from cachetools import TTLCache
 
-from plants_manager import count_plants
 from auth_service import logout_user
-from data_manager import get_all_readings
-
-from ui.plants_ui import plants_screen
-from ui.sensors_ui import sensors_screen
-from ui.search_ui import search_screen
-from ui.upload_ui import upload_screen
-from ui.dashboard_ui import dashboard_screen
-from ui.auth_ui import auth_screen
+from plants_manager import list_plants, on_plants_cache_cleared
+from data_manager import get_home_snapshot, generate_vacation_report, VACATION_STATUS_ICONS
+from ui.html_utils import escape_html
 
 
 # =========================
 # Vacation mode bridge
 # =========================
+# The report is read-only, so it is rendered as a plain HTML table
+# (no interactive grid to initialize and no column-type inference per refresh)
+_VACATION_TABLE_HEAD = (
+    "<table>"
+    "<colgroup><col style='width:15%'><col style='width:10%'><col style='width:15%'><col style='width:60%'></colgroup>"
+    "<thead><tr><th>Plant</th><th>Current Soil</th><th>Status</th><th>Message</th></tr></thead><tbody>"
+)
+
+
+def _vacation_table_html(rows) -> str:
+    if not rows:
+        return ""
+    body = "".join(
+        "<tr>" + "".join(f"<td>{escape_html(cell)}</td>" for cell in row) + "</tr>"
+        for row in rows
+    )
+    return f"{_VACATION_TABLE_HEAD}{body}</tbody></table>"
+
+
 def run_vacation_check(days, current_username, progress=gr.Progress(track_tqdm=True)):
     if days is None:
-        return []
+        return ""
 
     if not current_username:
-        return [["Error", "-", "❌", "No user logged in"]]
-
-    # Create a callback wrapper for Gradio progress
-    def gradio_callback(pct, desc=""):
-        progress(pct, desc=desc)
+        return _vacation_table_html([["Error", "-", VACATION_STATUS_ICONS["ERROR"], "No user logged in"]])
 
-    from data_manager import generate_vacation_report
-    return generate_vacation_report(current_username, days, progress_callback=gradio_callback)
+    return _vacation_table_html(
+        generate_vacation_report(current_username, days, progress_callback=progress)
+    )
 
 
 # =========================
 # Helpers for metrics
 # =========================
+# Python 3.11+ fromisoformat accepts a trailing "Z" natively
+_HAS_NATIVE_Z = sys.version_info >= (3, 11)
+
+
 def _parse_iso(ts):
     if not ts:
         return None
+    if not _HAS_NATIVE_Z and ts.endswith("Z"):
+        ts = ts[:-1] + "+00:00"
     try:
         return datetime.fromisoformat(ts)
-    except Exception:
-        try:
-            return datetime.fromisoformat(ts.replace("Z", "+00:00"))
-        except Exception:
-            return None
+    except (TypeError, ValueError):
+        return None
 
 
 def _time_ago(dt: datetime | None) -> str:
@@ -54,9 +73,8 @@ def _time_ago(dt: datetime | None) -> str:
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
 
-    now = datetime.now(timezone.utc)
-    diff = now - dt
-    mins = int(diff.total_seconds() // 60)
+    # Plain epoch-second arithmetic: no datetime.now()/timedelta objects per call
+    mins = int((time.time() - dt.timestamp()) // 60)
 
     if mins < 1:
         return "just now"
@@ -70,32 +88,178 @@ def _time_ago(dt: datetime | None) -> str:
     return f"{hrs // 24}d ago"
 
 
+# Login and navigation fire several metric refreshes back-to-back; they share one
+# computation. Plant writes invalidate a user's entry (see _invalidate_overview).
+_METRICS_CACHE: TTLCache = TTLCache(maxsize=256, ttl=10.0)  # {username: (plants_n, last_reading, avg_soil)}
+_EMPTY_METRICS = (0, "n/a", 0.0)
+_metrics_lock = threading.Lock()
+# Computations currently running, so concurrent requests for a user wait on one
+_INFLIGHT: dict[str, Future] = {}
+# Bumped on every invalidation, so a computation that started before a
+# plant was added/deleted doesn't write its (stale) result back to the cache
+_GENERATION: dict[str, int] = {}
+_global_generation = 0
+
+
+def _generation(username) -> tuple:
+    # Caller holds _metrics_lock
+    return _global_generation, _GENERATION.get(username, 0)
+
+
+def _invalidate_overview(username=None) -> None:
+    """Drops cached metrics for `username` (all users when None)."""
+    global _global_generation
+    with _metrics_lock:
+        if username:
+            _METRICS_CACHE.pop(username, None)
+            _INFLIGHT.pop(username, None)
+            _GENERATION[username] = _GENERATION.get(username, 0) + 1
+        else:
+            _METRICS_CACHE.clear()
+            _INFLIGHT.clear()
+            _global_generation += 1
+
+
+# Adding/deleting a plant clears that user's plant cache, and with it these metrics
+on_plants_cache_cleared(_invalidate_overview)
+
+
 def _compute_overview_metrics(username=None):
     """
     Computes Home overview metrics:
     - number of plants
     - last sensor reading time
     - average soil moisture (last 50 readings)
+    Results are reused for 10 seconds per username, and concurrent calls
+    for the same user share a single in-flight computation.
     """
+    if not username:
+        # Nothing to show without a user, so skip the sensor scan entirely
+        return _EMPTY_METRICS
+
+    with _metrics_lock:
+        hit = _METRICS_CACHE.get(username)
+        if hit is not None:
+            return hit
+        fut = _INFLIGHT.get(username)
+        owner = fut is None
+        if owner:
+            fut = _INFLIGHT[username] = Future()
+            started = _generation(username)
+
+    if not owner:
+        return fut.result()
+
     try:
-        plants_n = int(count_plants(username) if username else 0)
+        result = _overview_metrics_uncached(username)
+    except BaseException as e:
+        with _metrics_lock:
+            if _INFLIGHT.get(username) is fut:
+                _INFLIGHT.pop(username)
+        fut.set_exception(e)
+        raise
+
+    with _metrics_lock:
+        # An invalidation during the computation already dropped this future
+        # from _INFLIGHT (later callers start a fresh one); don't cache the result
+        if _generation(username) == started:
+            _METRICS_CACHE[username] = result
+        if _INFLIGHT.get(username) is fut:
+            _INFLIGHT.pop(username)
+    fut.set_result(result)
+    return result
+
+
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="home-prefetch")
+
+
+def _prefetch_overview(username) -> None:
+    """
+    Starts computing `username`'s metrics in the background right at login.
+    on_login_success then joins the in-flight computation (or hits the cache)
+    instead of starting the queries only after the extra round-trip.
+    Also warms the shared plant-list cache that Plants, Sensors and
+    Dashboard all read, so whichever opens first doesn't wait on Firestore.
+    """
+    if username:
+        _PREFETCH_EXECUTOR.submit(_compute_overview_metrics, username)
+        _PREFETCH_EXECUTOR.submit(list_plants, username)
+
+
+def _overview_metrics_uncached(username):
+    # One call for the plant count and the recent readings (fetched concurrently);
+    # the newest reading doubles as "last reading", so no separate limit=1 query
+    snap = get_home_snapshot(username)
+
+    try:
+        plants_n = int(snap["plants"] or 0)
     except Exception:
         plants_n = 0
 
     try:
-        latest = get_all_readings(limit=1) or []
-        latest_ts = _parse_iso(latest[0].get("timestamp")) if latest else None
+        recent = snap["readings"] or []
+        latest_ts = _parse_iso(recent[0].get("timestamp")) if recent else None
         last_reading = _time_ago(latest_ts)
 
-        recent = get_all_readings(limit=50) or []
-        soils = [r.get("soil") for r in recent if r.get("soil") is not None]
-        avg_soil = round(sum(soils) / len(soils), 1) if soils else 0.0
+        # One pass over the readings; rounded like before (round(mean, 1))
+        tot = 0.0
+        n = 0
+        for r in recent:
+            v = r.get("soil")
+            if v is not None:
+                tot += v
+                n += 1
+        avg_soil = round(tot / n, 1) if n else 0.0
 
     except Exception:
         last_reading, avg_soil = "n/a", 0.0
 
     return plants_n, last_reading, avg_soil
 
+# Custom CSS to control the table layout:
+# 1. Enforces 'nowrap' on the 3rd column (Status) to keep the icon and text on one line.
+# 2. Sets a minimum width for readability.
+_CUSTOM_CSS = """
+.vacation-table td:nth-child(3) { 
+    white-space: nowrap !important; 
+    min-width: 140px;
+}
+.vacation-table table { width: 100%; border-collapse: collapse; }
+.vacation-table th, .vacation-table td { padding: 4px 8px; text-align: left; vertical-align: top; }
+.metric-summary .metric-row { display: flex; gap: 12px; }
+.metric-summary .metric { flex: 1; display: flex; flex-direction: column; padding: 8px 12px; border-radius: 8px; }
+.metric-summary .metric span { font-size: 0.85em; opacity: 0.75; }
+.metric-summary .metric b { font-size: 1.4em; }
+"""
+
+# Logout always produces the same updates, so they are built once
+_LOGOUT_RESULT = (
+    None,                        # user_state
+    gr.update(visible=False),    # nav_row
+    gr.update(visible=False),    # home
+    gr.update(visible=False),    # plants
+    gr.update(visible=False),    # sensors
+    gr.update(visible=False),    # search
+    gr.update(visible=False),    # dashboard
+    gr.update(visible=False),    # upload
+    gr.update(visible=True),     # auth
+    gr.update(visible=True),     # logout_btn (inside hidden nav anyway)
+    "",                          # user_status_label
+    "Not logged in.",            # auth_current_user
+    "",                          # auth_login_msg
+    "",                          # auth_reg_msg
+    False,                       # nav_visible_state
+)
+
+def _metrics_html(plants_n, last_reading, avg_soil) -> str:
+    return (
+        "<div class='metric-row'>"
+        f"<div class='metric'><span>My plants</span><b>{plants_n}</b></div>"
+        f"<div class='metric'><span>Last sensor reading</span><b>{escape_html(last_reading)}</b></div>"
+        f"<div class='metric'><span>Avg soil (last 50)</span><b>{avg_soil}</b></div>"
+        "</div>"
+    )
+
 # =========================
 # HOME SCREEN
 # =========================
@@ -104,19 +268,18 @@ def home_screen():
     Builds the main dashboard UI.
     Includes custom CSS to fix table formatting for the Vacation Mode report.
     """
+    # Screen modules are imported here, not at module level, so importing
+    # home_ui (helpers, tests, tooling) doesn't pull in every page's dependencies
+    from ui.plants_ui import plants_screen
+    from ui.sensors_ui import sensors_screen
+    from ui.search_ui import search_screen
+    from ui.upload_ui import upload_screen
+    from ui.dashboard_ui import dashboard_screen
+    from ui.auth_ui import auth_screen
     
-    # Custom CSS to control the table layout:
-    # 1. Enforces 'nowrap' on the 3rd column (Status) to keep the icon and text on one line.
-    # 2. Sets a minimum width for readability.
-    custom_css = """
-    .vacation-table td:nth-child(3) { 
-        white-space: nowrap !important; 
-        min-width: 140px;
-    }
-    """
-
-    with gr.Blocks(title="My Garden Care", theme=gr.themes.Glass(), css=custom_css) as app:
+    with gr.Blocks(title="My Garden Care", theme=gr.themes.Glass(), css=_CUSTOM_CSS) as app:
         user_state = gr.State(value=None)
+        nav_visible_state = gr.State(False)  # whether nav_row/logout_btn are currently shown
 
         # ---------- TOP BAR ----------
         with gr.Row():
@@ -141,10 +304,8 @@ def home_screen():
             with gr.Row():
                 qa_plants = gr.Button("🌿 View my plants", variant="secondary")
 
-            with gr.Row():
-                m_plants = gr.Number(label="My plants", interactive=False)
-                m_last = gr.Textbox(label="Last sensor reading", interactive=False)
-                m_avg_soil = gr.Number(label="Avg soil (last 50)", interactive=False)
+            # All three metrics in one component: one payload and one DOM update per refresh.
+            m_summary = gr.HTML(_metrics_html(*_EMPTY_METRICS), elem_classes=["metric-summary"])
 
             btn_refresh = gr.Button("Refresh", variant="secondary")
 
@@ -166,16 +327,9 @@ def home_screen():
                     )
                     check_btn = gr.Button("Check", variant="primary")
 
-                # Table configuration:
-                # - 'column_widths': Allocates 50% width to the Message column to prevent cramping.
-                # - 'elem_classes': Links this component to the 'vacation-table' CSS class defined above.
-                vacation_table = gr.Dataframe(
-                    headers=["Plant", "Current Soil", "Status", "Message"],
-                    interactive=False,
-                    wrap=True,
-                    column_widths=["15%", "10%", "15%", "60%"], 
-                    elem_classes="vacation-table"
-                )
+                # Filled by _vacation_table_html; column widths live in its <colgroup>.
+                # 'elem_classes' links this component to the 'vacation-table' CSS class defined above.
+                vacation_table = gr.HTML(elem_classes="vacation-table")
 
                 check_btn.click(
                     fn=run_vacation_check,
@@ -201,114 +355,105 @@ def home_screen():
             upload_screen(user_state)
 
         with gr.Column(visible=True) as auth:
-            login_event, auth_current_user, auth_login_msg, auth_reg_msg = auth_screen(user_state)
+            login_event, auth_current_user, auth_login_msg, auth_reg_msg = auth_screen(user_state, on_login=_prefetch_overview)
 
 
         # ---------- NAV ----------
+        page_names = ("home", "plants", "sensors", "search", "dashboard", "upload", "auth")
+        # One precomputed row of visibility updates per target, reused on every click
+        go_table = {t: [gr.update(visible=(t == p)) for p in page_names] for t in page_names}
+
         def go(target):
-            return [
-                gr.update(visible=(target == "home")),
-                gr.update(visible=(target == "plants")),
-                gr.update(visible=(target == "sensors")),
-                gr.update(visible=(target == "search")),
-                gr.update(visible=(target == "dashboard")),
-                gr.update(visible=(target == "upload")),
-                gr.update(visible=(target == "auth")),
-            ]
+            return go_table[target]
 
         pages = [home, plants, sensors, search, dashboard, upload, auth]
         
         # Always start on Auth page 
-        app.load(lambda: go("auth"), outputs=pages)
+        app.load(lambda: go("auth"), outputs=pages, queue=False)
 
         # ------------------------
         # Auto-load on navigation
         # ------------------------
-        btn_home.click(lambda: go("home"), outputs=pages)
-        btn_sensors.click(lambda: go("sensors"), outputs=pages).then(
-            fn=sensors_load, inputs=sensors_inputs, outputs=sensors_outputs
-        )
-        btn_search.click(lambda: go("search"), outputs=pages)
-        btn_dashboard.click(lambda: go("dashboard"), outputs=pages).then(
-            fn=dashboard_load, inputs=dashboard_inputs, outputs=dashboard_outputs
-        )
-        btn_upload.click(lambda: go("upload"), outputs=pages)
-        # btn_auth.click(lambda: go("auth"), outputs=pages)
-
-        # btn_open_plants.click(lambda: go("plants"), outputs=pages)
-        qa_plants.click(lambda: go("plants"), outputs=pages).then(
-            fn=plants_load, inputs=plants_inputs, outputs=plants_outputs
-        )
+        # Page switches only return precomputed updates, so they skip the queue;
+        # the data-loading .then() steps stay queued.
+        # (button, target page, optional (load_fn, inputs, outputs) run after the switch)
+        nav = [
+            (btn_home, "home", None),
+            (btn_sensors, "sensors", (sensors_load, sensors_inputs, sensors_outputs)),
+            (btn_search, "search", None),
+            (btn_dashboard, "dashboard", (dashboard_load, dashboard_inputs, dashboard_outputs)),
+            (btn_upload, "upload", None),
+            (qa_plants, "plants", (plants_load, plants_inputs, plants_outputs)),
+        ]
+        for btn, target, then_load in nav:
+            event = btn.click(functools.partial(go, target), outputs=pages, queue=False)
+            if then_load:
+                load_fn, load_inputs, load_outputs = then_load
+                event.then(fn=load_fn, inputs=load_inputs, outputs=load_outputs)
 
         # ---------- METRICS ----------
         def refresh_metrics(u):
-            username = u.strip() if isinstance(u, str) else None
-            return _compute_overview_metrics(username)
+            # user_state holds an already-stripped username (set in auth_ui.do_login)
+            if not u:
+                return _metrics_html(*_EMPTY_METRICS)
+            return _metrics_html(*_compute_overview_metrics(u))
 
-        btn_refresh.click(refresh_metrics, inputs=[user_state], outputs=[m_plants, m_last, m_avg_soil])
-        app.load(refresh_metrics, inputs=[user_state], outputs=[m_plants, m_last, m_avg_soil])
+        btn_refresh.click(refresh_metrics, inputs=[user_state], outputs=[m_summary])
+        # No app.load refresh: a new session has no user yet, and on_login_success fills the metrics
 
         # ------------------------
         # Login -> show navbar + redirect to home
         # ------------------------
-        def on_login_success(username):
+        def on_login_success(username, was_visible):
             """
             After successful login:
             - show navbar
             - show logout button
             - set user status label
             - refresh home metrics
+            - redirect to Home
+            All in one event, so login costs a single round-trip.
+            Navbar updates are empty (no-op) when its visibility doesn't change.
             """
             if username:
-                plants_n, last_reading, avg_soil = _compute_overview_metrics(username)
+                nav = gr.update() if was_visible else gr.update(visible=True)
                 return (
-                    gr.update(visible=True),               # nav_row
-                    gr.update(visible=True),               # logout_btn
+                    nav,                                   # nav_row
+                    nav,                                   # logout_btn
                     f"👤 Logged in as: **{username}**",     # user_status_label
-                    plants_n, last_reading, avg_soil
+                    _metrics_html(*_compute_overview_metrics(username)),  # m_summary
+                    True,                                  # nav_visible_state
+                    *go("home"),
                 )
 
+            # Failed login: stay on the Auth page
+            nav = gr.update(visible=False) if was_visible else gr.update()
             return (
-                gr.update(visible=False),
-                gr.update(visible=False),
+                nav,
+                nav,
                 "",
-                0, "n/a", 0.0
+                _metrics_html(*_EMPTY_METRICS),
+                False,
+                *go("auth"),
             )
 
         login_event.then(
             fn=on_login_success,
-            inputs=[user_state],
-            outputs=[nav_row, logout_btn, user_status_label, m_plants, m_last, m_avg_soil]
+            inputs=[user_state, nav_visible_state],
+            outputs=[nav_row, logout_btn, user_status_label, m_summary, nav_visible_state, *pages]
         )
 
-        # Redirect to Home after login
-        login_event.then(lambda: go("home"), outputs=pages)
-
         # ------------------------
         # Logout -> hide navbar + go to auth
         # ------------------------
         def do_logout():
             logout_user()
-            return (
-                None,                        # user_state
-                gr.update(visible=False),    # nav_row
-                gr.update(visible=False),    # home
-                gr.update(visible=False),    # plants
-                gr.update(visible=False),    # sensors
-                gr.update(visible=False),    # search
-                gr.update(visible=False),    # dashboard
-                gr.update(visible=False),    # upload
-                gr.update(visible=True),     # auth
-                gr.update(visible=True),     # logout_btn (inside hidden nav anyway)
-                "",                          # user_status_label
-                "Not logged in.",            # auth_current_user
-                "",                          # auth_login_msg
-                "",                          # auth_reg_msg
-            )
+            return _LOGOUT_RESULT
 
         logout_btn.click(
             fn=do_logout,
-            outputs=[user_state, nav_row, home, plants, sensors, search, dashboard, upload, auth, logout_btn, user_status_label, auth_current_user, auth_login_msg, auth_reg_msg]
+            outputs=[user_state, nav_row, home, plants, sensors, search, dashboard, upload, auth, logout_btn, user_status_label, auth_current_user, auth_login_msg, auth_reg_msg, nav_visible_state],
+            queue=False,
         )
 
 
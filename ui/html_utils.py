@@ -0,0 +1,9 @@
+# Small HTML helpers shared by the UI screens.
+
+# Same replacements as html.escape(quote=True), applied in a single translate pass
+_ESC = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+
+
+def escape_html(value) -> str:
+    """HTML-escapes str(value) (&, <, >, quotes) for use in text or attributes."""
+    return str(value).translate(_ESC)
@@ -1,6 +1,18 @@
 
 import gradio as gr
-from plants_manager import list_plants, delete_plant
+from plants_manager import plant_gallery_columns, delete_plant
+
+# Gallery page size: the first render ships at most this many image URLs
+PAGE_SIZE = 12
+
+# Fixed outputs of the empty/no-login branches, built once.
+# Only visibility-only updates are shared: Gradio pops "value" out of an update
+# dict while processing it, so updates carrying a value are built per call.
+_HIDE = gr.update(visible=False)
+_SHOW = gr.update(visible=True)
+_LOGIN_HTML = '<div class="card"><h3>🔒 Login required</h3><p>Please login.</p></div>'
+_NO_PLANTS_HTML = '<div class="card"><h3>🌱 No plants yet</h3><p>Go to <b>Upload</b> to add your first plant, then come back and press <b>Load Plants</b>.</p></div>'
+_NO_IMAGES_HTML = '<div class="card"><h3>🖼️ No images found</h3><p>Your plants exist, but they don’t have images/URLs yet.</p></div>'
 
 
 def _get_username(user_state):
@@ -40,23 +52,32 @@ def plants_screen(user_state: gr.State):
         rows=2,
         height=350,
         object_fit="scale-down",
-        allow_preview=True,
-        preview=True,
+        allow_preview=False,
         show_label=False,
         visible=False,
     )
 
+    # Gallery shows thumbnails; the full-size image is fetched only on click
+    full_view = gr.Image(label="", interactive=False, visible=False)
+
     with gr.Row(visible=False) as delete_row:
         plant_to_delete = gr.Dropdown(label="Delete plant (by name)", choices=[], value=None)
         del_btn = gr.Button("Delete", variant="stop")
 
+    more_btn = gr.Button("Load more", variant="secondary", visible=False)
+
     del_status = gr.Markdown()
 
+    # All gallery items for the user (kept server-side) + how many are shown
+    items_state = gr.State([])
+    shown_state = gr.State(0)
+    full_urls_state = gr.State([])
+
     def load(u):
       #   Load plants for current user:
       #   - If not logged-in -> show 'login required'
       #   - If no plants -> show empty state
-      #   - Else -> fill gallery + delete dropdown
+      #   - Else -> fill gallery (first page only) + delete dropdown
 
         username = _get_username(u)
 
@@ -64,62 +85,64 @@ def plants_screen(user_state: gr.State):
         if not username:
             return (
                 "⚠️ Please login to see your plants.",
-                '<div class="card"><h3>🔒 Login required</h3><p>Please login.</p></div>',
+                _LOGIN_HTML,
                 gr.update(visible=False, value=[]),
-                gr.update(visible=False),
+                _HIDE,
                 gr.update(choices=[], value=None),
-                ""
+                "",
+                [], 0, _HIDE, [], gr.update(visible=False, value=None),
             )
 
-        plants = list_plants(username) or []
+        cols = plant_gallery_columns(username)
 
         # --- Logged in but no plants ---
-        if not plants:
+        if not cols["count"]:
             return (
                 f"Logged in as **{username}**",
-                '<div class="card"><h3>🌱 No plants yet</h3><p>Go to <b>Upload</b> to add your first plant, then come back and press <b>Load Plants</b>.</p></div>',
+                _NO_PLANTS_HTML,
                 gr.update(visible=False, value=[]),
-                gr.update(visible=False),
+                _HIDE,
                 gr.update(choices=[], value=None),
-                ""
+                "",
+                [], 0, _HIDE, [], gr.update(visible=False, value=None),
             )
 
         # --- Have plants ---
-        items = []
-        delete_choices = []
-
-        for p in plants:
-            pid = p.get("plant_id") or p.get("id") or ""
-            name = (p.get("name") or p.get("species") or "").strip() or "Plant"
-            img = p.get("image_url") or p.get("image_path")
-
-            # Gallery can display local server paths OR real URLs
-            if img:
-                items.append((img, name))
-
-            # Show NAME to user, but keep pid as value
-            if pid:
-                delete_choices.append((name, pid))
+        # Gallery wants (image, caption) pairs; full-size URLs are kept for on-click
+        items = list(zip(cols["thumbs"], cols["names"]))
+        full_urls = cols["images"]
+        delete_choices = cols["choices"]
 
         if not items:
             return (
                 f"Logged in as **{username}**",
-                '<div class="card"><h3>🖼️ No images found</h3><p>Your plants exist, but they don’t have images/URLs yet.</p></div>',
+                _NO_IMAGES_HTML,
                 gr.update(visible=False, value=[]),
-                gr.update(visible=True),
+                _SHOW,
                 gr.update(choices=delete_choices, value=None),
-                ""
+                "",
+                [], 0, _HIDE, [], gr.update(visible=False, value=None),
             )
 
+        shown = min(PAGE_SIZE, len(items))
         return (
             f"✅ Loaded **{len(items)}** plants.",
             "",
-            gr.update(visible=True, value=items),
-            gr.update(visible=True),
+            gr.update(visible=True, value=items[:shown]),
+            _SHOW,
             gr.update(choices=delete_choices, value=None),
-            ""
+            "",
+            items, shown, _SHOW if shown < len(items) else _HIDE,
+            full_urls, gr.update(visible=False, value=None),
         )
 
+    def load_more(items, shown):
+      #   Show the next page of already-loaded items (no Firestore call).
+
+        items = items or []
+        shown = min((shown or 0) + PAGE_SIZE, len(items))
+        return gr.update(value=items[:shown]), shown, _SHOW if shown < len(items) else _HIDE
+
     def on_delete(u, pid):
       #   Delete selected plant (by id), then reload UI state.
 
@@ -128,26 +151,51 @@ def plants_screen(user_state: gr.State):
             return load(u)
 
         if not pid:
-            msg, empty_html, gal_upd, delrow_upd, dd_upd, _ = load(u)
-            return msg, empty_html, gal_upd, delrow_upd, dd_upd, "⚠️ Please select a plant to delete."
+            out = load(u)
+            return (*out[:5], "⚠️ Please select a plant to delete.", *out[6:])
 
         ok, msg_del = delete_plant(username, pid)
-        msg, empty_html, gal_upd, delrow_upd, dd_upd, _ = load(u)
-        return msg, empty_html, gal_upd, delrow_upd, dd_upd, ("✅ Deleted." if ok else f"❌ {msg_del}")
+        out = load(u)
+        return (*out[:5], ("✅ Deleted." if ok else f"❌ {msg_del}"), *out[6:])
+
+    def show_full(items, full_urls, evt: gr.SelectData):
+      #   Show the full-resolution image of the clicked gallery item.
+
+        i = evt.index
+        if not full_urls or not isinstance(i, int) or i >= len(full_urls):
+            return gr.update(visible=False, value=None)
+        return gr.update(visible=True, value=full_urls[i], label=items[i][1])
+
+    outputs = [info, empty_state, gallery, delete_row, plant_to_delete, del_status,
+               items_state, shown_state, more_btn, full_urls_state, full_view]
 
     refresh_btn.click(
         fn=load,
         inputs=[user_state],
-        outputs=[info, empty_state, gallery, delete_row, plant_to_delete, del_status]
+        outputs=outputs
+    )
+
+    more_btn.click(
+        fn=load_more,
+        inputs=[items_state, shown_state],
+        outputs=[gallery, shown_state, more_btn],
+        queue=False,
+    )
+
+    gallery.select(
+        fn=show_full,
+        inputs=[items_state, full_urls_state],
+        outputs=[full_view],
+        queue=False,
     )
 
     del_btn.click(
         fn=on_delete,
         inputs=[user_state, plant_to_delete],
-        outputs=[info, empty_state, gallery, delete_row, plant_to_delete, del_status]
+        outputs=outputs
 
     )
     
     # Return wiring for auto-load on navigation
-    return refresh_btn, load, [user_state], [info, empty_state, gallery, delete_row, plant_to_delete, del_status]
+    return refresh_btn, load, [user_state], outputs
 
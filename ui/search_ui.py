@@ -1,97 +1,134 @@
 import gradio as gr
-import ast
+import threading
+from cachetools import TTLCache
 from data_manager import PlantRAG
 
 _RAG = None
 
+# Rendered answers keyed by (normalized question, top_k): a re-asked question
+# skips embedding, vector search and the Gemini call
+_ANSWER_CACHE = TTLCache(maxsize=256, ttl=600)
+_answer_lock = threading.Lock()
+
+_rag_lock = threading.Lock()
+
+
 def _get_rag() -> PlantRAG:
     global _RAG
     if _RAG is None:
-        _RAG = PlantRAG()
+        # Lock so the warm-up thread and a first click don't both build it
+        with _rag_lock:
+            if _RAG is None:
+                _RAG = PlantRAG()
     return _RAG
 
 
+def _warm_rag() -> None:
+    # Builds PlantRAG (model imports) and loads the index while the app is idle,
+    # so the first query doesn't pay for it. query() reloads if this fails.
+    try:
+        rag = _get_rag()
+        with _rag_lock:
+            rag.load_from_firestore()
+    except Exception as e:
+        print(f"[Search] RAG warm-up failed: {e}")
+
+
+threading.Thread(target=_warm_rag, name="rag-warmup", daemon=True).start()
+
+
+def _paper_card(i: int, c: dict) -> str:
+    # One paper's markdown: only the fields that exist, joined once
+    title = (c.get("title") or "Untitled").strip()
+    url = (c.get("url") or "").strip()
+    meta = c.get("metadata") or {}  # already a dict (parsed in PlantRAG.query)
+    authors = (meta.get("authors") or "").strip()
+    journal = (meta.get("journal") or "").strip()
+    year = (meta.get("year") or "").strip()
+    doi = (meta.get("doi") or "").strip()
+
+    # --- url is resolved at ingestion (DOI link if no url); DOI fallback kept for older indexes ---
+    link_url = url or (f"https://doi.org/{doi}" if doi else "")
+
+    # Title line (clickable if we have either url or doi)
+    lines = [f"**{i}. [{title}]({link_url})**" if link_url else f"**{i}. {title}**"]
+
+    # (optional) clean authors a bit
+    if authors:
+        authors = authors.partition("E-mail")[0].partition("Accepted")[0].strip()
+        lines.append(f"- 👤 Authors: {authors}")
+
+    # Metadata lines (only if exist) - remove "Unknown journal"
+    if journal:
+        lines.append(f"- 📰 {journal} ({year})" if year else f"- 📰 {journal}")
+    elif year:
+        lines.append(f"- 🗓️ Year: {year}")
+
+    # DOI as a clickable link (not just code)
+    if doi:
+        lines.append(f"- 🔗 DOI: [{doi}](https://doi.org/{doi})")
+
+    return "\n".join(lines)
+
+
 def _fmt_paper_lines(chunks, limit: int = 3) -> str:
     chunks = (chunks or [])[:limit]
     if not chunks:
         return "_No sources available._"
 
-    lines = []
-    for i, c in enumerate(chunks, start=1):
-        title = (c.get("title") or "Untitled").strip()
-        url = (c.get("url") or "").strip()
-        meta = c.get("metadata") or {}
-        if isinstance(meta, str):
-            try:
-                meta = ast.literal_eval(meta)
-            except Exception:
-                meta = {}
-        authors = (meta.get("authors") or "").strip()
-        journal = (meta.get("journal") or "").strip()
-        year = (meta.get("year") or "").strip()
-        doi = (meta.get("doi") or "").strip()
-
-        # --- choose best link: url if exists, else DOI link ---
-        link_url = url
-        if not link_url and doi:
-            link_url = f"https://doi.org/{doi}"
-
-        # Title line (clickable if we have either url or doi)
-        if link_url:
-            lines.append(f"**{i}. [{title}]({link_url})**")
-        else:
-            lines.append(f"**{i}. {title}**")
-
-        # (optional) clean authors a bit
-        if authors:
-            authors = authors.split("E-mail")[0].split("Accepted")[0].strip()
-            lines.append(f"- 👤 Authors: {authors}")
-
-        # Metadata lines (only if exist) - remove "Unknown journal"
-        if journal:
-            if year:
-                lines.append(f"- 📰 {journal} ({year})")
-            else:
-                lines.append(f"- 📰 {journal}")
-        elif year:
-            lines.append(f"- 🗓️ Year: {year}")
-
-        # DOI as a clickable link (not just code)
-        if doi:
-            lines.append(f"- 🔗 DOI: [{doi}](https://doi.org/{doi})")
-
-        lines.append("")
-
-    return "\n".join(lines).strip()
-
-
-
-def run_query(question: str, top_k: int = 3, progress=gr.Progress(track_tqdm=True)) -> str:
-    q = (question or "").strip()
-    if not q:
-        return "⚠️ Please enter a question."
-
-    # Create a callback wrapper for Gradio progress
-    def gradio_callback(pct, desc=""):
-        progress(pct, desc=desc)
-    
-    out = _get_rag().query(q, top_k=int(top_k), progress_callback=gradio_callback)
+    return "\n\n".join(_paper_card(i, c) for i, c in enumerate(chunks, start=1))
 
-    answer = (out.get("response") or "").strip()
-    chunks = out.get("chunks") or []
-    papers_found = int(out.get("papers_found") or len(chunks))
 
-    md = []
-    md.append("### Research-based Answer")
-    md.append("")
-    md.append(answer if answer else "_No answer returned._")
-    md.append("")
-    md.append("---")
-    md.append(f"**Found {papers_found} relevant papers:**")
-    md.append("")
-    md.append(_fmt_paper_lines(chunks, limit=min(int(top_k), 5)))
 
-    return "\n".join(md)
+def run_query(question: str, top_k: int = 3, progress=gr.Progress(track_tqdm=True)):
+    # Generator: Gradio streams each yielded markdown while the answer is generated
+    q = (question or "").strip()
+    if not q:
+        yield "⚠️ Please enter a question."
+        return
+
+    top_k = int(top_k)
+    key = (" ".join(q.lower().split()), top_k)
+    with _answer_lock:
+        cached = _ANSWER_CACHE.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    rag = _get_rag()
+    if not rag.loaded:
+        # Waits for a warm-up still in progress instead of loading twice
+        with _rag_lock:
+            rag.load_from_firestore()
+
+    result = ""
+    papers_md = None
+    used_gemini = False
+    for out in rag.query_stream(q, top_k=top_k, progress_callback=progress):
+        used_gemini = bool(out.get("used_gemini"))
+        if papers_md is None:
+            # Sources don't change while the answer streams: format them once
+            chunks = out.get("chunks") or []
+            papers_found = int(out.get("papers_found") or len(chunks))
+            papers_md = (
+                "---\n"
+                f"**Found {papers_found} relevant papers:**\n\n"
+                f"{_fmt_paper_lines(chunks, limit=min(top_k, 5))}"
+            )
+
+        answer = (out.get("response") or "").strip()
+        result = (
+            "### Research-based Answer\n\n"
+            f"{answer or '_No answer returned._'}\n\n"
+            f"{papers_md}"
+        )
+        yield result
+
+    # Only complete Gemini answers are cached: a fallback excerpt or "no results"
+    # from a short outage shouldn't be pinned for this question
+    if used_gemini:
+        with _answer_lock:
+            _ANSWER_CACHE[key] = result
 
 
 def search_screen():
@@ -113,6 +150,7 @@ def search_screen():
 
     submit.click(run_query, inputs=[question, top_k], outputs=[output])
     question.submit(run_query, inputs=[question, top_k], outputs=[output])
-    clear.click(lambda: ("", 3, ""), outputs=[question, top_k, output])
+    # Pure reset: done in the browser, no server round-trip
+    clear.click(fn=None, js="() => ['', 3, '']", outputs=[question, top_k, output])
 
     return output
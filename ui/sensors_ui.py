@@ -1,7 +1,13 @@
+import functools
 import gradio as gr
+from concurrent.futures import ThreadPoolExecutor
 
 from plants_manager import list_plants
-from data_manager import get_latest_reading, get_sensor_history, sync_iot_data
+from data_manager import get_sensor_bundle, claim_iot_sync, maybe_sync_iot_data, sync_iot_data
+from ui.html_utils import escape_html
+
+# IoT syncs triggered by navigation/dropdown changes run here, off the render path
+_SYNC_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="iot-sync")
 
 
 def _get_username(user_state):
@@ -16,6 +22,49 @@ def _plant_label(p: dict) -> str:
     return f"{title} ({pid})" if pid else title
 
 
+@functools.lru_cache(maxsize=None)
+def _metric_template(label: str) -> str:
+    # Label part is fixed per card; only the value is substituted per refresh
+    return f"""
+        <div class="metric">
+          <div class="label">{label}</div>
+          <div class="value">{{v}}</div>
+        </div>
+        """
+
+
+def _metric_html(label: str, value):
+    return _metric_template(label).format(v="N/A" if value is None else value)
+
+
+# History is read-only, so it is rendered as a plain HTML table
+# (no pandas/Dataframe serialization on every refresh)
+_HISTORY_TABLE_HEAD = (
+    "<b>Latest history (most recent first)</b>"
+    "<table class='sensorHist'>"
+    "<thead><tr><th>timestamp</th><th>temp</th><th>humidity</th><th>soil</th></tr></thead><tbody>"
+)
+
+
+def _history_table_html(hist) -> str:
+    body = "".join(
+        "<tr>" + "".join(
+            f"<td>{'' if v is None else escape_html(v)}</td>"
+            for v in (r.get("timestamp"), r.get("temp"), r.get("humidity"), r.get("soil"))
+        ) + "</tr>"
+        for r in hist
+    )
+    return f"{_HISTORY_TABLE_HEAD}{body}</tbody></table>"
+
+
+# Metric cards for the no-login / no-plants branches, built once
+_NA_METRICS = (
+    _metric_html("Temp (°C)", None),
+    _metric_html("Humidity (%)", None),
+    _metric_html("Soil", None),
+)
+
+
 def sensors_screen(user_state: gr.State):
     gr.Markdown("## 🌱 IoT Sensors")
     info = gr.Markdown()
@@ -30,35 +79,17 @@ def sensors_screen(user_state: gr.State):
         m_hum = gr.HTML()
         m_soil = gr.HTML()
 
-    history = gr.Dataframe(
-        headers=["timestamp", "temp", "humidity", "soil"],
-        datatype=["str", "number", "number", "number"],
-        interactive=False,
-        row_count=10,
-        col_count=(4, "fixed"),
-        label="Latest history (most recent first)",
-    )
-
-    def _metric_html(label: str, value):
-        v = "N/A" if value is None else value
-        return f"""
-        <div class="metric">
-          <div class="label">{label}</div>
-          <div class="value">{v}</div>
-        </div>
-        """
+    history = gr.HTML()
 
-    def load(u, chosen_pid):
+    def load(u, chosen_pid, sync_now=False):
         username = _get_username(u)
 
         if not username:
             return (
                 "⚠️ Please login to view sensors data.",
                 gr.update(choices=[], value=None),
-                _metric_html("Temp (°C)", None),
-                _metric_html("Humidity (%)", None),
-                _metric_html("Soil", None),
-                [],
+                *_NA_METRICS,
+                "",
             )
 
         plants = list_plants(username) or []
@@ -72,31 +103,29 @@ def sensors_screen(user_state: gr.State):
             return (
                 f"🌱 No plants found. Add a plant in **Upload**, then come back.",
                 gr.update(choices=[], value=None),
-                _metric_html("Temp (°C)", None),
-                _metric_html("Humidity (%)", None),
-                _metric_html("Soil", None),
-                [],
+                *_NA_METRICS,
+                "",
             )
 
         pid = chosen_pid or choices[0][1]
 
-        # pull 1 fresh sample and store in Firestore
-        sync_iot_data(pid)
-
-        latest = get_latest_reading(pid)
+        # pull 1 fresh sample and store in Firestore: inline on Refresh (so it's
+        # shown right away), otherwise in the background for the next refresh.
+        # Same per-plant 30s throttle as the dashboard, checked before queueing
+        # so quick picks don't pile syncs up in the executor.
+        if sync_now:
+            maybe_sync_iot_data(pid, force=True)
+        elif claim_iot_sync(pid):
+            _SYNC_EXECUTOR.submit(sync_iot_data, pid)
+
+        # Latest reading and history come from the same query
+        bundle = get_sensor_bundle(pid, limit=10)
+        latest = bundle["latest"]
         temp = latest.get("temp") if latest else None
         hum = latest.get("humidity") if latest else None
         soil = latest.get("soil") if latest else None
 
-        hist = get_sensor_history(pid, limit=10) or []
-        rows = []
-        for r in hist:
-            rows.append([
-                r.get("timestamp"),
-                r.get("temp"),
-                r.get("humidity"),
-                r.get("soil"),
-            ])
+        hist = bundle["history"] or []
 
         return (
             f"✅ Showing sensors for selected plant",
@@ -104,21 +133,25 @@ def sensors_screen(user_state: gr.State):
             _metric_html("Temp (°C)", temp),
             _metric_html("Humidity (%)", hum),
             _metric_html("Soil", soil),
-            rows,
+            _history_table_html(hist),
         )
 
-    # Reactive: update when dropdown selection changes
-    plant_dd.change(
+    # Reactive: update when the user picks a plant. .input (not .change) so
+    # load() setting plant_dd itself doesn't re-fire a second load, and
+    # always_last so rapid picks collapse into one run for the final choice.
+    plant_dd.input(
         fn=load,
         inputs=[user_state, plant_dd],
         outputs=[info, plant_dd, m_temp, m_hum, m_soil, history],
+        trigger_mode="always_last",
     )
 
     # Manual refresh button (for syncing new IoT data)
     refresh_btn.click(
-        fn=load,
+        fn=lambda u, pid: load(u, pid, sync_now=True),
         inputs=[user_state, plant_dd],
         outputs=[info, plant_dd, m_temp, m_hum, m_soil, history],
+        trigger_mode="once",  # ignore clicks while a sync is still running
     )
 
     # Return components for external wiring (auto-load on navigation)
@@ -33,16 +33,12 @@ def upload_screen(user_state: gr.State):
         if not str(name).strip():
             return "⚠️ Please enter plant name.", gr.update(), gr.update(), gr.update()
 
-        # Create a callback wrapper for Gradio progress
-        def gradio_callback(pct, desc=""):
-            progress(pct, desc=desc)
-
         ok, plant_id_or_err = add_plant_with_image(
             username=username,
             name=name,
             species=sp or "",
             pil_image=img,
-            progress_callback=gradio_callback,
+            progress_callback=progress,
         )
 
         if not ok: